@@ -19,8 +19,9 @@ from routes.nilai_static import nilai_static_bp
 from routes.admin_siswa import admin_siswa_bp
 from routes.admin_pakar import admin_pakar_bp
 from routes.simulation import simulation_bp
+from routes.jobs import jobs_bp
 
-from command import seed_db, migrate_fresh
+from command import seed_db, migrate_fresh, recalc_periode, backfill_static, run_worker_command
 # Import konfigurasi dan database yang sudah kita siapkan
 from config import Config
 from models import db
@@ -52,6 +53,9 @@ jwt = JWTManager(app)
 
 app.cli.add_command(seed_db)
 app.cli.add_command(migrate_fresh)
+app.cli.add_command(recalc_periode)
+app.cli.add_command(backfill_static)
+app.cli.add_command(run_worker_command)
 
 
 app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -69,6 +73,7 @@ app.register_blueprint(nilai_static_bp, url_prefix='/api/nilai-static')
 app.register_blueprint(admin_siswa_bp, url_prefix='/api/admin/siswa')
 app.register_blueprint(admin_pakar_bp, url_prefix='/api/admin/pakar')
 app.register_blueprint(simulation_bp, url_prefix='/api/simulation')
+app.register_blueprint(jobs_bp, url_prefix='/api/jobs')
 
 
 
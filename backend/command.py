@@ -334,4 +334,63 @@ def migrate_fresh():
 
     # Panggil seed_db
     ctx = click.get_current_context()
-    ctx.invoke(seed_db)
\ No newline at end of file
+    ctx.invoke(seed_db)
+
+@click.command(name='recalc-periode')
+@click.option('--periode-id', type=int, default=None, help='ID periode (default: periode aktif).')
+@with_appcontext
+def recalc_periode(periode_id):
+    """Hitung ulang HasilRekomendasi seluruh siswa aktif di satu periode (engine batch)."""
+    from routes.moora import calculate_ranking_batch, get_siswa_ids_periode
+
+    if periode_id:
+        periode = Periode.query.get(periode_id)
+    else:
+        periode = Periode.query.filter_by(is_active=True).first()
+
+    if not periode:
+        print("❌ Periode tidak ditemukan.")
+        return
+
+    siswa_ids = get_siswa_ids_periode(periode.id)
+
+    print(f"🔄 Menghitung ulang {len(siswa_ids)} siswa di periode {periode.nama_periode}...")
+    results = calculate_ranking_batch(periode.id, siswa_ids)
+    db.session.commit()
+    print(f"✅ {len(results)} hasil rekomendasi diperbarui.")
+
+
+@click.command(name='backfill-static')
+@click.option('--jurusan-id', type=int, default=None, help='ID jurusan (default: semua jurusan).')
+@with_appcontext
+def backfill_static(jurusan_id):
+    """Salin nilai kriteria statis jurusan ke NilaiSiswa (satu INSERT ... SELECT per jurusan)."""
+    from routes.moora import backfill_static_values
+
+    jurusan_list = [Jurusan.query.get(jurusan_id)] if jurusan_id else Jurusan.query.all()
+    total = 0
+    for jurusan in jurusan_list:
+        if not jurusan:
+            print("❌ Jurusan tidak ditemukan.")
+            return
+        count = backfill_static_values(jurusan.id)
+        print(f"   ↳ {jurusan.kode_jurusan}: {count} nilai statis disalin")
+        total += count
+
+    db.session.commit()
+    print(f"✅ Backfill selesai, {total} baris ditambahkan.")
+
+
+@click.command(name='run-worker')
+@click.option('--once', is_flag=True, help='Proses antrian sampai kosong lalu berhenti.')
+@with_appcontext
+def run_worker_command(once):
+    """Jalankan worker job hitung ulang (tabel job_hitungs)."""
+    from worker import run_worker, requeue_running_jobs
+
+    requeued = requeue_running_jobs()
+    if requeued:
+        print(f"⚠️  {requeued} job yang terputus dikembalikan ke antrian.")
+
+    print("👷 Worker berjalan...")
+    run_worker(once=once)
@@ -20,4 +20,20 @@ class Config:
     SQLALCHEMY_DATABASE_URI = f"mysql+pymysql://{DB_USER}:{DB_PASS}@{DB_HOST}:{DB_PORT}/{DB_NAME}"
     SQLALCHEMY_TRACK_MODIFICATIONS = False
 
-    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'kunci_rahasia_super_aman_ganti_nanti')
\ No newline at end of file
+    JWT_SECRET_KEY = os.environ.get('JWT_SECRET_KEY', 'kunci_rahasia_super_aman_ganti_nanti')
+
+    # Solver BWM (process pool terpisah dari worker request, 0 = jalankan langsung tanpa pool).
+    # Pool & antrian dibuat PER PROSES web: tiap worker gunicorn punya pool sendiri, jadi default ukuran
+    # pool = core / jumlah worker gunicorn (WEB_CONCURRENCY, juga dibaca gunicorn sebagai --workers).
+    WEB_WORKERS = max(int(os.environ.get('WEB_CONCURRENCY', 1)), 1)
+    SOLVER_WORKERS = int(os.environ.get('SOLVER_WORKERS', max((os.cpu_count() or 1) // WEB_WORKERS, 1)))
+    # Maks. solve antri + berjalan per proses web (batas total = WEB_WORKERS x nilai ini)
+    SOLVER_QUEUE_SIZE = int(os.environ.get('SOLVER_QUEUE_SIZE', SOLVER_WORKERS * 4))
+    SOLVER_TIMEOUT = float(os.environ.get('SOLVER_TIMEOUT', 5))  # Detik per solve
+    SOLVER_RETRY_AFTER = int(os.environ.get('SOLVER_RETRY_AFTER', 2))  # Header Retry-After saat penuh (detik)
+
+    # Skoring MOORA setelah siswa menyimpan kuesioner:
+    # 'sync' = dihitung dalam request, 'deferred' = request hanya menyimpan lalu worker menghitung per batch
+    SISWA_SCORING_MODE = os.environ.get('SISWA_SCORING_MODE', 'sync')
+    SCORING_INTERVAL = float(os.environ.get('SCORING_INTERVAL', 0.3))  # Jeda antar batch skoring worker (detik)
+    SCORING_BATCH_SIZE = int(os.environ.get('SCORING_BATCH_SIZE', 500))  # Maks. siswa per batch
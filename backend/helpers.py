@@ -0,0 +1,78 @@
+import uuid
+
+from sqlalchemy import func
+from sqlalchemy.dialects.mysql import insert as mysql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+from models import db, Setting
+
+# Batas jumlah baris per statement agar jumlah parameter tetap aman
+UPSERT_CHUNK_SIZE = 1000
+
+
+def bulk_upsert(model, rows, index_elements, update_columns):
+    """
+    INSERT ... ON DUPLICATE KEY UPDATE untuk banyak baris sekaligus.
+    `index_elements` adalah kolom unique key (dipakai dialek non-MySQL),
+    `update_columns` adalah kolom yang ditimpa jika baris sudah ada.
+    Tidak melakukan commit, pemanggil yang menentukan batas transaksi.
+    """
+    if not rows:
+        return 0
+
+    table = model.__table__
+    dialect = db.session.get_bind().dialect.name
+    has_updated_at = 'updated_at' in table.c
+
+    for start in range(0, len(rows), UPSERT_CHUNK_SIZE):
+        chunk = rows[start:start + UPSERT_CHUNK_SIZE]
+
+        if dialect == 'mysql':
+            stmt = mysql_insert(table).values(chunk)
+            set_ = {col: stmt.inserted[col] for col in update_columns}
+            if has_updated_at:
+                set_['updated_at'] = func.now()
+            stmt = stmt.on_duplicate_key_update(set_)
+        else:
+            # Fallback (SQLite/dev): sintaks ON CONFLICT
+            stmt = sqlite_insert(table).values(chunk)
+            set_ = {col: stmt.excluded[col] for col in update_columns}
+            if has_updated_at:
+                set_['updated_at'] = func.now()
+            stmt = stmt.on_conflict_do_update(index_elements=index_elements, set_=set_)
+
+        db.session.execute(stmt)
+
+    return len(rows)
+
+
+# --- VERSI CACHE (Disimpan di tabel Settings agar konsisten antar worker) ---
+# Setiap cache in-process menyimpan versi saat dibangun, lalu dibangun ulang
+# jika versi di DB sudah berubah.
+VERSI_KRITERIA = 'versi_kriteria'
+VERSI_BOBOT = 'versi_bobot'
+VERSI_STATIC = 'versi_static'
+VERSI_ALUMNI = 'versi_alumni'
+VERSI_FGD = 'versi_fgd'  # Best/Worst global hasil FGD (Setting BWM admin)
+VERSI_PERIODE = 'versi_periode'  # Periode aktif (routes/periode)
+
+
+def get_versions(*keys):
+    """Ambil beberapa versi sekaligus (satu query). Versi yang belum ada dianggap '0'."""
+    rows = db.session.query(Setting.key, Setting.value).filter(Setting.key.in_(keys)).all()
+    found = {key: value for key, value in rows}
+    return {key: found.get(key) or '0' for key in keys}
+
+
+def get_version(key):
+    return get_versions(key)[key]
+
+
+def bump_version(key):
+    """Ganti versi dengan token baru (tanpa commit, ikut transaksi pemanggil)."""
+    setting = Setting.query.filter_by(key=key).first()
+    if not setting:
+        setting = Setting(key=key, type='version')
+        db.session.add(setting)
+    setting.value = uuid.uuid4().hex[:16]
+    return setting.value
@@ -0,0 +1,32 @@
+"""Unique hasil_rekomendasi per siswa & periode
+
+Revision ID: 3b7c1d9e4a21
+Revises: 9e1f245e2006
+Create Date: 2026-10-17 09:12:31.104522
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b7c1d9e4a21'
+down_revision = '9e1f245e2006'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bersihkan duplikat lama (simpan baris terbaru) sebelum memasang unique key
+    op.execute(
+        "DELETE h1 FROM hasil_rekomendasi h1 "
+        "JOIN hasil_rekomendasi h2 ON h1.siswa_id = h2.siswa_id "
+        "AND h1.periode_id = h2.periode_id AND h1.id < h2.id"
+    )
+    with op.batch_alter_table('hasil_rekomendasi', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_hasil_siswa_periode', ['siswa_id', 'periode_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('hasil_rekomendasi', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_hasil_siswa_periode', type_='unique')
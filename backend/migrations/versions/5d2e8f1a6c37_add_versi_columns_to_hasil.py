@@ -0,0 +1,28 @@
+"""Add versi columns to hasil_rekomendasi
+
+Revision ID: 5d2e8f1a6c37
+Revises: 3b7c1d9e4a21
+Create Date: 2026-10-17 10:03:12.418230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5d2e8f1a6c37'
+down_revision = '3b7c1d9e4a21'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('hasil_rekomendasi', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('versi_input', sa.Integer(), server_default='0', nullable=False))
+        batch_op.add_column(sa.Column('versi_hitung', sa.String(length=100), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('hasil_rekomendasi', schema=None) as batch_op:
+        batch_op.drop_column('versi_hitung')
+        batch_op.drop_column('versi_input')
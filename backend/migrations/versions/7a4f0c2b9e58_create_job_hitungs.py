@@ -0,0 +1,43 @@
+"""Create job_hitungs table
+
+Revision ID: 7a4f0c2b9e58
+Revises: 5d2e8f1a6c37
+Create Date: 2026-10-17 11:20:45.902113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7a4f0c2b9e58'
+down_revision = '5d2e8f1a6c37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('job_hitungs',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('periode_id', sa.Integer(), nullable=False),
+    sa.Column('status', sa.String(length=20), nullable=False),
+    sa.Column('alasan', sa.String(length=255), nullable=True),
+    sa.Column('total', sa.Integer(), nullable=False),
+    sa.Column('processed', sa.Integer(), nullable=False),
+    sa.Column('pesan_error', sa.Text(), nullable=True),
+    sa.Column('started_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('finished_at', sa.DateTime(timezone=True), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['periode_id'], ['periodes.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id')
+    )
+    with op.batch_alter_table('job_hitungs', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_job_hitungs_status'), ['status'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('job_hitungs', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_job_hitungs_status'))
+
+    op.drop_table('job_hitungs')
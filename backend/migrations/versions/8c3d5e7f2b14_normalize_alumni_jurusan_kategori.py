@@ -0,0 +1,46 @@
+"""Normalize alumni jurusan & kategori
+
+Revision ID: 8c3d5e7f2b14
+Revises: 7a4f0c2b9e58
+Create Date: 2026-10-17 13:05:27.551940
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c3d5e7f2b14'
+down_revision = '7a4f0c2b9e58'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('alumnis', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('jurusan_id', sa.Integer(), nullable=True))
+        batch_op.add_column(sa.Column('kategori', sa.String(length=20), nullable=True))
+        batch_op.create_foreign_key('fk_alumnis_jurusan_id', 'jurusan', ['jurusan_id'], ['id'], ondelete='SET NULL')
+        batch_op.create_index('ix_alumnis_jurusan_kategori', ['jurusan_id', 'kategori', 'batch'], unique=False)
+
+    # Backfill data lama (sama dengan aturan normalize_alumni di routes/alumni.py)
+    op.execute(
+        "UPDATE alumnis a JOIN jurusan j "
+        "ON a.major LIKE CONCAT('%', j.nama_jurusan, '%') OR a.major = j.kode_jurusan "
+        "SET a.jurusan_id = j.id"
+    )
+    op.execute(
+        "UPDATE alumnis SET kategori = CASE "
+        "WHEN status LIKE '%wirausaha%' OR status REGEXP '(^|[^a-z0-9])usaha([^a-z0-9]|$)' THEN 'wirausaha' "
+        "WHEN status LIKE '%kuliah%' OR status LIKE '%studi%' THEN 'studi' "
+        "WHEN status LIKE '%kerja%' THEN 'kerja' "
+        "ELSE NULL END"
+    )
+
+
+def downgrade():
+    with op.batch_alter_table('alumnis', schema=None) as batch_op:
+        batch_op.drop_index('ix_alumnis_jurusan_kategori')
+        batch_op.drop_constraint('fk_alumnis_jurusan_id', type_='foreignkey')
+        batch_op.drop_column('kategori')
+        batch_op.drop_column('jurusan_id')
@@ -0,0 +1,42 @@
+"""Jawaban siswa per pertanyaan (jawaban_siswas) + nilai_siswa.jumlah_jawaban
+
+Revision ID: a6d2f8c4e019
+Revises: f3c8a1e5b742
+Create Date: 2026-10-17 17:31:54.209716
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a6d2f8c4e019'
+down_revision = 'f3c8a1e5b742'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('jawaban_siswas',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('siswa_id', sa.Integer(), nullable=False),
+    sa.Column('pertanyaan_id', sa.Integer(), nullable=False),
+    sa.Column('nilai', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['siswa_id'], ['users.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['pertanyaan_id'], ['pertanyaans.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('siswa_id', 'pertanyaan_id', name='uq_jawaban_siswa_pertanyaan')
+    )
+
+    # Nilai lama tidak punya jawaban per pertanyaan -> jumlah 0
+    with op.batch_alter_table('nilai_siswa', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('jumlah_jawaban', sa.Integer(), server_default='0', nullable=False))
+
+
+def downgrade():
+    with op.batch_alter_table('nilai_siswa', schema=None) as batch_op:
+        batch_op.drop_column('jumlah_jawaban')
+
+    op.drop_table('jawaban_siswas')
@@ -0,0 +1,46 @@
+"""Create bobot_konsensus & deviasi_pakars tables (Group BWM)
+
+Revision ID: b4e9a2c6d813
+Revises: 8c3d5e7f2b14
+Create Date: 2026-10-17 14:05:12.418230
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b4e9a2c6d813'
+down_revision = '8c3d5e7f2b14'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('bobot_konsensus',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('kriteria_id', sa.Integer(), nullable=False),
+    sa.Column('nilai_bobot', sa.Float(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['kriteria_id'], ['kriteria.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('kriteria_id')
+    )
+    op.create_table('deviasi_pakars',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('pakar_id', sa.Integer(), nullable=False),
+    sa.Column('cr', sa.Float(), nullable=True),
+    sa.Column('bobot_pakar', sa.Float(), nullable=True),
+    sa.Column('deviasi', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['pakar_id'], ['users.id'], ondelete='CASCADE'),
+    sa.PrimaryKeyConstraint('id'),
+    sa.UniqueConstraint('pakar_id')
+    )
+
+
+def downgrade():
+    op.drop_table('deviasi_pakars')
+    op.drop_table('bobot_konsensus')
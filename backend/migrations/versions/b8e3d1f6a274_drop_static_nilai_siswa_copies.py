@@ -0,0 +1,41 @@
+"""Hapus salinan nilai kriteria static_jurusan di nilai_siswa
+
+Revision ID: b8e3d1f6a274
+Revises: a6d2f8c4e019
+Create Date: 2026-10-18 09:20:41.773015
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b8e3d1f6a274'
+down_revision = 'a6d2f8c4e019'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Salinan lama dari ensure_static_values menutupi tabel nilai statis jurusan saat hitung,
+    # sehingga perubahan NilaiStaticJurusan tidak pernah sampai ke skor siswa tersebut.
+    op.execute(
+        "DELETE n FROM nilai_siswa n "
+        "JOIN kriteria k ON k.id = n.kriteria_id "
+        "WHERE k.sumber_nilai = 'static_jurusan'"
+    )
+
+    # Hasil lama jadi basi: ganti versi nilai statis & antrikan hitung ulang periode aktif
+    op.execute(
+        "INSERT INTO settings (`key`, value, type) VALUES ('versi_static', 'b8e3d1f6a274', 'version') "
+        "ON DUPLICATE KEY UPDATE value = VALUES(value)"
+    )
+    op.execute(
+        "INSERT INTO job_hitungs (periode_id, status, alasan, total, processed, created_at) "
+        "SELECT id, 'pending', 'nilai_static', 0, 0, NOW() FROM periodes WHERE is_active = 1"
+    )
+
+
+def downgrade():
+    # Data salinan tidak dikembalikan (bisa dibuat ulang dengan: flask backfill-static)
+    pass
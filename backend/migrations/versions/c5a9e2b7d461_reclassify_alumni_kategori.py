@@ -0,0 +1,31 @@
+"""Klasifikasi ulang alumnis.kategori ('usaha' hanya kata utuh)
+
+Revision ID: c5a9e2b7d461
+Revises: b8e3d1f6a274
+Create Date: 2026-10-18 09:47:15.380226
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'c5a9e2b7d461'
+down_revision = 'b8e3d1f6a274'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Backfill 8c3d5e7f2b14 versi lama memasukkan "perusahaan" ke wirausaha (lihat KATEGORI_PATTERNS)
+    op.execute(
+        "UPDATE alumnis SET kategori = CASE "
+        "WHEN status LIKE '%wirausaha%' OR status REGEXP '(^|[^a-z0-9])usaha([^a-z0-9]|$)' THEN 'wirausaha' "
+        "WHEN status LIKE '%kuliah%' OR status LIKE '%studi%' THEN 'studi' "
+        "WHEN status LIKE '%kerja%' THEN 'kerja' "
+        "ELSE NULL END"
+    )
+
+
+def downgrade():
+    pass
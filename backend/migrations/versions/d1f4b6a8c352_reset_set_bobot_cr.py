@@ -0,0 +1,26 @@
+"""Kosongkan set_bobots.cr yang dinormalisasi dengan CI(9)
+
+Revision ID: d1f4b6a8c352
+Revises: c5a9e2b7d461
+Create Date: 2026-10-19 10:12:40.518734
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd1f4b6a8c352'
+down_revision = 'c5a9e2b7d461'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # CR lama selalu dibagi CI(9) (a_BW dicari per indeks). CR kosong dihitung ulang dari perbandingan
+    # pakar dengan CI(a_BW) saat solve Group BWM berikutnya (lihat routes/bwm.pakar_consistency_ratios)
+    op.execute("UPDATE set_bobots SET cr = NULL")
+
+
+def downgrade():
+    pass
@@ -0,0 +1,94 @@
+"""Versioned BWM weight sets (set_bobots) + active pointer per scope
+
+Revision ID: d7a1f3b5c920
+Revises: b4e9a2c6d813
+Create Date: 2026-10-17 15:12:40.207318
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'd7a1f3b5c920'
+down_revision = 'b4e9a2c6d813'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('set_bobots',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('pakar_id', sa.Integer(), nullable=True),
+    sa.Column('jurusan_id', sa.Integer(), nullable=True),
+    sa.Column('best_criterion_id', sa.Integer(), nullable=True),
+    sa.Column('worst_criterion_id', sa.Integer(), nullable=True),
+    sa.Column('cr', sa.Float(), nullable=True),
+    sa.Column('ksi', sa.Float(), nullable=True),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.text('now()'), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.ForeignKeyConstraint(['pakar_id'], ['users.id'], ondelete='SET NULL'),
+    sa.ForeignKeyConstraint(['jurusan_id'], ['jurusan.id'], ondelete='CASCADE'),
+    sa.ForeignKeyConstraint(['best_criterion_id'], ['kriteria.id'], ),
+    sa.ForeignKeyConstraint(['worst_criterion_id'], ['kriteria.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+
+    with op.batch_alter_table('bwm_comparisons', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('set_bobot_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_bwm_comparisons_set_bobot_id', 'set_bobots', ['set_bobot_id'], ['id'], ondelete='CASCADE')
+
+    with op.batch_alter_table('bobot_kriterias', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('set_bobot_id', sa.Integer(), nullable=True))
+        batch_op.create_foreign_key('fk_bobot_kriterias_set_bobot_id', 'set_bobots', ['set_bobot_id'], ['id'], ondelete='CASCADE')
+
+    # Backfill: perbandingan lama -> satu set per pakar (+ Best/Worst)
+    op.execute(
+        "INSERT INTO set_bobots (pakar_id, jurusan_id, best_criterion_id, worst_criterion_id, created_at) "
+        "SELECT c.pakar_id, CASE WHEN u.jenis_pakar = 'kaprodi' THEN u.jurusan_id END, "
+        "c.best_criterion_id, c.worst_criterion_id, NOW() "
+        "FROM bwm_comparisons c JOIN users u ON u.id = c.pakar_id "
+        "GROUP BY c.pakar_id, c.best_criterion_id, c.worst_criterion_id, u.jenis_pakar, u.jurusan_id"
+    )
+    op.execute(
+        "UPDATE bwm_comparisons c JOIN set_bobots s ON s.pakar_id = c.pakar_id "
+        "AND s.best_criterion_id = c.best_criterion_id AND s.worst_criterion_id = c.worst_criterion_id "
+        "SET c.set_bobot_id = s.id"
+    )
+
+    # Backfill: bobot lama -> satu set per scope (jurusan / umum) + pointer aktif
+    op.execute(
+        "INSERT INTO set_bobots (jurusan_id, created_at) "
+        "SELECT DISTINCT jurusan_id, NOW() FROM bobot_kriterias"
+    )
+    op.execute(
+        "UPDATE bobot_kriterias b JOIN set_bobots s ON s.pakar_id IS NULL AND s.jurusan_id <=> b.jurusan_id "
+        "SET b.set_bobot_id = s.id"
+    )
+    op.execute(
+        "INSERT INTO settings (`key`, value, type, created_at) "
+        "SELECT CONCAT('bobot_aktif:', IFNULL(CONCAT('jurusan:', jurusan_id), 'umum')), id, 'pointer', NOW() "
+        "FROM set_bobots WHERE pakar_id IS NULL"
+    )
+
+    with op.batch_alter_table('bwm_comparisons', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_bwm_comparison_set', ['set_bobot_id', 'comparison_type', 'compared_criterion_id'])
+
+    with op.batch_alter_table('bobot_kriterias', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_bobot_kriteria_set', ['set_bobot_id', 'kriteria_id'])
+
+
+def downgrade():
+    op.execute("DELETE FROM settings WHERE `key` LIKE 'bobot_aktif:%'")
+
+    with op.batch_alter_table('bobot_kriterias', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_bobot_kriteria_set', type_='unique')
+        batch_op.drop_constraint('fk_bobot_kriterias_set_bobot_id', type_='foreignkey')
+        batch_op.drop_column('set_bobot_id')
+
+    with op.batch_alter_table('bwm_comparisons', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_bwm_comparison_set', type_='unique')
+        batch_op.drop_constraint('fk_bwm_comparisons_set_bobot_id', type_='foreignkey')
+        batch_op.drop_column('set_bobot_id')
+
+    op.drop_table('set_bobots')
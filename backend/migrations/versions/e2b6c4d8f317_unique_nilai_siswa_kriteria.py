@@ -0,0 +1,32 @@
+"""Unique nilai_siswa per siswa & kriteria
+
+Revision ID: e2b6c4d8f317
+Revises: d7a1f3b5c920
+Create Date: 2026-10-17 16:05:22.518304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2b6c4d8f317'
+down_revision = 'd7a1f3b5c920'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Bersihkan duplikat lama (simpan baris terbaru) sebelum memasang unique key
+    op.execute(
+        "DELETE n1 FROM nilai_siswa n1 "
+        "JOIN nilai_siswa n2 ON n1.siswa_id = n2.siswa_id "
+        "AND n1.kriteria_id = n2.kriteria_id AND n1.id < n2.id"
+    )
+    with op.batch_alter_table('nilai_siswa', schema=None) as batch_op:
+        batch_op.create_unique_constraint('uq_nilai_siswa_kriteria', ['siswa_id', 'kriteria_id'])
+
+
+def downgrade():
+    with op.batch_alter_table('nilai_siswa', schema=None) as batch_op:
+        batch_op.drop_constraint('uq_nilai_siswa_kriteria', type_='unique')
@@ -0,0 +1,85 @@
+"""Backfill jawaban_siswas dari nilai_siswa lama (jumlah_jawaban = 0)
+
+Revision ID: e7a3c9d1f528
+Revises: d1f4b6a8c352
+Create Date: 2026-10-19 14:05:22.731946
+
+"""
+import json
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e7a3c9d1f528'
+down_revision = 'd1f4b6a8c352'
+branch_labels = None
+depends_on = None
+
+jawaban_siswas = sa.table('jawaban_siswas',
+    sa.column('siswa_id', sa.Integer),
+    sa.column('pertanyaan_id', sa.Integer),
+    sa.column('nilai', sa.Float)
+)
+
+
+def upgrade():
+    # Rata-rata NilaiSiswa sekarang dihitung dari jawaban_siswas (routes/siswa.apply_answers). Tanpa backfill,
+    # autosave pertama siswa lama menghitung rata-rata kriteria dari satu jawaban saja.
+    # Sumber jawaban: snapshot hasil terakhir siswa jika rata-ratanya sama dengan nilai tersimpan,
+    # selain itu nilai tersimpan diisikan ke tiap pertanyaan aktif kriteria (rata-rata tetap sama).
+    bind = op.get_bind()
+
+    pertanyaan_map = {}
+    aktif = {}
+    for p_id, k_id, kode, teks, is_active in bind.execute(sa.text(
+            "SELECT p.id, p.kriteria_id, k.kode, p.teks, p.is_active FROM pertanyaans p "
+            "JOIN kriteria k ON k.id = p.kriteria_id WHERE k.sumber_nilai = 'input_siswa'")):
+        pertanyaan_map[(kode, teks)] = (p_id, k_id)
+        if is_active:
+            aktif.setdefault(k_id, []).append(p_id)
+
+    snapshots = {}
+    for siswa_id, snapshot in bind.execute(sa.text(
+            "SELECT siswa_id, detail_snapshot FROM hasil_rekomendasi "
+            "WHERE detail_snapshot IS NOT NULL ORDER BY id")):
+        snapshots[siswa_id] = json.loads(snapshot) if isinstance(snapshot, str) else snapshot
+
+    sudah_ada = set(bind.execute(sa.text(
+        "SELECT DISTINCT j.siswa_id, p.kriteria_id FROM jawaban_siswas j "
+        "JOIN pertanyaans p ON p.id = j.pertanyaan_id")).fetchall())
+
+    rows = []
+    jumlah = []
+    for n_id, siswa_id, k_id, rata in bind.execute(sa.text(
+            "SELECT n.id, n.siswa_id, n.kriteria_id, n.nilai_input FROM nilai_siswa n "
+            "JOIN kriteria k ON k.id = n.kriteria_id "
+            "WHERE n.jumlah_jawaban = 0 AND k.sumber_nilai = 'input_siswa'")):
+        if rata is None or (siswa_id, k_id) in sudah_ada:
+            continue
+
+        jawaban = {}
+        for item in snapshots.get(siswa_id) or []:
+            info = pertanyaan_map.get((item.get('kriteria_kode'), item.get('pertanyaan_teks')))
+            if info and info[1] == k_id:
+                try:
+                    jawaban[info[0]] = float(item.get('jawaban_nilai') or 0)
+                except (ValueError, TypeError):
+                    continue
+
+        if not jawaban or abs(sum(jawaban.values()) / len(jawaban) - rata) > 1e-6:
+            jawaban = {p_id: rata for p_id in aktif.get(k_id, [])}
+        if not jawaban:
+            continue
+
+        rows.extend({'siswa_id': siswa_id, 'pertanyaan_id': p_id, 'nilai': nilai} for p_id, nilai in jawaban.items())
+        jumlah.append({'id': n_id, 'jumlah': len(jawaban)})
+
+    if rows:
+        op.bulk_insert(jawaban_siswas, rows)
+        bind.execute(sa.text("UPDATE nilai_siswa SET jumlah_jawaban = :jumlah WHERE id = :id"), jumlah)
+
+
+def downgrade():
+    pass
@@ -0,0 +1,26 @@
+"""Index hasil_rekomendasi (periode_id, versi_hitung) untuk antrian skoring
+
+Revision ID: f3c8a1e5b742
+Revises: e2b6c4d8f317
+Create Date: 2026-10-17 16:48:10.662091
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3c8a1e5b742'
+down_revision = 'e2b6c4d8f317'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('hasil_rekomendasi', schema=None) as batch_op:
+        batch_op.create_index('ix_hasil_periode_versi_hitung', ['periode_id', 'versi_hitung'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('hasil_rekomendasi', schema=None) as batch_op:
+        batch_op.drop_index('ix_hasil_periode_versi_hitung')
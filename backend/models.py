@@ -168,11 +168,34 @@ class Pertanyaan(db.Model):
     kriteria = db.relationship('Kriteria', backref=db.backref('list_pertanyaan', cascade="all, delete-orphan"))
 
 
+class SetBobot(db.Model):
+    """
+    Satu kali simpan perbandingan BWM oleh pakar (versi set bobot).
+    Set yang dipakai per scope ditunjuk oleh Setting 'bobot_aktif:<scope>'.
+    """
+    __tablename__ = 'set_bobots'
+
+    id = db.Column(db.Integer, primary_key=True)
+    pakar_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='SET NULL'), nullable=True)
+    jurusan_id = db.Column(db.Integer, db.ForeignKey('jurusan.id', ondelete='CASCADE'), nullable=True)
+
+    best_criterion_id = db.Column(db.Integer, db.ForeignKey('kriteria.id'), nullable=True)
+    worst_criterion_id = db.Column(db.Integer, db.ForeignKey('kriteria.id'), nullable=True)
+    cr = db.Column(db.Float, nullable=True)
+    ksi = db.Column(db.Float, nullable=True)
+
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
+
+
 class BwmComparison(db.Model):
     __tablename__ = 'bwm_comparisons'
+    __table_args__ = (db.UniqueConstraint('set_bobot_id', 'comparison_type', 'compared_criterion_id',
+                                          name='uq_bwm_comparison_set'),)
 
     id = db.Column(db.Integer, primary_key=True)
     pakar_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    set_bobot_id = db.Column(db.Integer, db.ForeignKey('set_bobots.id', ondelete='CASCADE'), nullable=True)
 
     # Self-referencing Foreign Keys ke Kriteria
     best_criterion_id = db.Column(db.Integer, db.ForeignKey('kriteria.id'), nullable=False)
@@ -188,12 +211,31 @@ class BwmComparison(db.Model):
 
 class NilaiSiswa(db.Model):
     __tablename__ = 'nilai_siswa'
+    # Satu nilai per siswa per kriteria (dipakai oleh bulk upsert)
+    __table_args__ = (db.UniqueConstraint('siswa_id', 'kriteria_id', name='uq_nilai_siswa_kriteria'),)
 
     id = db.Column(db.Integer, primary_key=True)
     siswa_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
     kriteria_id = db.Column(db.Integer, db.ForeignKey('kriteria.id', ondelete='CASCADE'), nullable=False)
 
     nilai_input = db.Column(db.Float, nullable=False)
+    # Banyak jawaban pertanyaan yang dirata-rata (0 = nilai lama tanpa jawaban per pertanyaan)
+    jumlah_jawaban = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
+
+
+class JawabanSiswa(db.Model):
+    """Jawaban siswa per pertanyaan (sumber rata-rata NilaiSiswa per kriteria)"""
+    __tablename__ = 'jawaban_siswas'
+    __table_args__ = (db.UniqueConstraint('siswa_id', 'pertanyaan_id', name='uq_jawaban_siswa_pertanyaan'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    siswa_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
+    pertanyaan_id = db.Column(db.Integer, db.ForeignKey('pertanyaans.id', ondelete='CASCADE'), nullable=False)
+
+    nilai = db.Column(db.Float, nullable=False)
 
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
@@ -209,6 +251,10 @@ class NilaiStaticJurusan(db.Model):
 
 class HasilRekomendasi(db.Model):
     __tablename__ = 'hasil_rekomendasi'
+    # Satu hasil per siswa per periode (dipakai oleh bulk upsert)
+    # versi_hitung NULL = menunggu dihitung worker (mode skoring deferred)
+    __table_args__ = (db.UniqueConstraint('siswa_id', 'periode_id', name='uq_hasil_siswa_periode'),
+                      db.Index('ix_hasil_periode_versi_hitung', 'periode_id', 'versi_hitung'))
 
     id = db.Column(db.Integer, primary_key=True)
     siswa_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), nullable=False)
@@ -227,6 +273,12 @@ class HasilRekomendasi(db.Model):
 
     detail_snapshot = db.Column(JSON, nullable=True)
 
+    # --- VERSI (Untuk deteksi hasil basi / stale) ---
+    # versi_input naik setiap siswa menyimpan input, versi_hitung menyimpan
+    # tanda versi (input, bobot, kriteria) yang dipakai saat skor dihitung.
+    versi_input = db.Column(db.Integer, default=0, server_default='0', nullable=False)
+    versi_hitung = db.Column(db.String(100), nullable=True)
+
     tanggal_hitung = db.Column(db.DateTime(timezone=True), server_default=func.now())
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
@@ -249,10 +301,12 @@ class Periode(db.Model):
 
 class BobotKriteria(db.Model):
     __tablename__ = 'bobot_kriterias'
+    __table_args__ = (db.UniqueConstraint('set_bobot_id', 'kriteria_id', name='uq_bobot_kriteria_set'),)
 
     id = db.Column(db.Integer, primary_key=True)
     kriteria_id = db.Column(db.Integer, db.ForeignKey('kriteria.id', ondelete='CASCADE'), nullable=False)
     jurusan_id = db.Column(db.Integer, db.ForeignKey('jurusan.id', ondelete='CASCADE'), nullable=True)
+    set_bobot_id = db.Column(db.Integer, db.ForeignKey('set_bobots.id', ondelete='CASCADE'), nullable=True)
 
     nilai_bobot = db.Column(db.Float, nullable=False)
 
@@ -260,8 +314,39 @@ class BobotKriteria(db.Model):
     updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
 
 
+class BobotKonsensus(db.Model):
+    """Bobot konsensus Group-BWM (satu solve gabungan semua pakar)"""
+    __tablename__ = 'bobot_konsensus'
+
+    id = db.Column(db.Integer, primary_key=True)
+    kriteria_id = db.Column(db.Integer, db.ForeignKey('kriteria.id', ondelete='CASCADE'), unique=True, nullable=False)
+
+    nilai_bobot = db.Column(db.Float, nullable=False)
+
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
+
+
+class DeviasiPakar(db.Model):
+    """Konsistensi tiap pakar & deviasinya terhadap bobot konsensus Group-BWM"""
+    __tablename__ = 'deviasi_pakars'
+
+    id = db.Column(db.Integer, primary_key=True)
+    pakar_id = db.Column(db.Integer, db.ForeignKey('users.id', ondelete='CASCADE'), unique=True, nullable=False)
+
+    cr = db.Column(db.Float, nullable=True)  # CR perbandingan pakar sendiri (saat disimpan)
+    bobot_pakar = db.Column(db.Float, nullable=True)  # Bobot pakar di LP gabungan (mode grup_cr)
+    deviasi = db.Column(db.Float, nullable=True)  # max |w_B - a_Bj w_j|, |w_j - a_jW w_W| pada bobot konsensus
+
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
+
+    pakar = db.relationship('User')
+
+
 class Alumni(db.Model):
     __tablename__ = 'alumnis'
+    __table_args__ = (db.Index('ix_alumnis_jurusan_kategori', 'jurusan_id', 'kategori', 'batch'),)
 
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(255), nullable=False)
@@ -269,6 +354,11 @@ class Alumni(db.Model):
     batch = db.Column(db.Integer, nullable=False)
     major = db.Column(db.String(255), nullable=False)
 
+    # --- NORMALISASI (diisi saat input/import, dipakai untuk saran alumni di halaman result) ---
+    jurusan_id = db.Column(db.Integer, db.ForeignKey('jurusan.id', ondelete='SET NULL'), nullable=True)
+    # Values: 'studi', 'kerja', 'wirausaha' (None jika status tidak dikenali)
+    kategori = db.Column(db.String(20), nullable=True)
+
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
     updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
 
@@ -282,4 +372,26 @@ class Setting(db.Model):  # Tambahan tabel Setting sesuai file migrasi
     type = db.Column(db.String(50), default='text')
 
     created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
-    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
\ No newline at end of file
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
+
+class JobHitung(db.Model):
+    """Antrian job hitung ulang HasilRekomendasi (diproses oleh worker.py)"""
+    __tablename__ = 'job_hitungs'
+
+    id = db.Column(db.Integer, primary_key=True)
+    periode_id = db.Column(db.Integer, db.ForeignKey('periodes.id', ondelete='CASCADE'), nullable=False)
+
+    # Values: 'pending', 'running', 'done', 'failed'
+    status = db.Column(db.String(20), default='pending', nullable=False, index=True)
+    alasan = db.Column(db.String(255), nullable=True)  # Pemicu: 'bwm', 'kriteria', 'nilai_static', ...
+
+    total = db.Column(db.Integer, default=0, nullable=False)
+    processed = db.Column(db.Integer, default=0, nullable=False)
+    pesan_error = db.Column(db.Text, nullable=True)
+
+    started_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    finished_at = db.Column(db.DateTime(timezone=True), nullable=True)
+    created_at = db.Column(db.DateTime(timezone=True), server_default=func.now())
+    updated_at = db.Column(db.DateTime(timezone=True), onupdate=func.now())
+
+    periode = db.relationship('Periode')
@@ -1,7 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt
 from werkzeug.security import generate_password_hash
-from models import db, User, RoleEnum, RiwayatKelas, Periode, Jurusan,NilaiSiswa, HasilRekomendasi
+from models import db, User, RoleEnum, RiwayatKelas, Periode, Jurusan,NilaiSiswa, JawabanSiswa, HasilRekomendasi
 
 admin_siswa_bp = Blueprint('admin_siswa', __name__)
 
@@ -126,11 +126,17 @@ def update_siswa(id):
         if 'username' in data: siswa.username = data['username']
 
         # Update Jurusan di User (Karena ini atribut melekat pada siswa di SMK)
+        jurusan_berubah = 'jurusan_id' in data and siswa.jurusan_id != int(data['jurusan_id'])
         if 'jurusan_id' in data: siswa.jurusan_id = int(data['jurusan_id'])
 
         # Update Kelas & Jurusan di RiwayatKelas (Periode Aktif)
         periode_aktif = Periode.query.filter_by(is_active=True).first()
         if periode_aktif:
+            # Nilai statis ikut jurusan -> tandai hasil periode aktif perlu dihitung ulang
+            if jurusan_berubah:
+                HasilRekomendasi.query.filter_by(siswa_id=siswa.id, periode_id=periode_aktif.id) \
+                    .update({HasilRekomendasi.versi_input: HasilRekomendasi.versi_input + 1})
+
             riwayat = RiwayatKelas.query.filter_by(
                 siswa_id=siswa.id,
                 periode_id=periode_aktif.id
@@ -177,6 +183,7 @@ def delete_siswa(id):
         # Menghapus data anak terlebih dahulu untuk menghindari error Foreign Key
         RiwayatKelas.query.filter_by(siswa_id=siswa.id).delete()
         NilaiSiswa.query.filter_by(siswa_id=siswa.id).delete()
+        JawabanSiswa.query.filter_by(siswa_id=siswa.id).delete()
         HasilRekomendasi.query.filter_by(siswa_id=siswa.id).delete()
 
         # Baru hapus user induk
@@ -1,11 +1,62 @@
 import pandas as pd
 import io
+import re
 from flask import Blueprint, request, jsonify, send_file
 from flask_jwt_extended import jwt_required, get_jwt
-from models import db, Alumni
+from models import db, Alumni, Jurusan
+from helpers import get_version, bump_version, VERSI_ALUMNI
 
 alumni_bp = Blueprint('alumni', __name__)
 
+# Pola status -> kategori (urutan penting: 'wirausaha' dicek sebelum yang lain).
+# 'usaha' hanya sebagai kata utuh agar "perusahaan" tidak masuk wirausaha.
+# Sama dengan CASE ... REGEXP di migrasi 8c3d5e7f2b14.
+KATEGORI_PATTERNS = [
+    ('wirausaha', re.compile(r'wirausaha|(^|[^a-z0-9])usaha([^a-z0-9]|$)')),
+    ('studi', re.compile(r'kuliah|studi')),
+    ('kerja', re.compile(r'kerja')),
+]
+SARAN_LIMIT = 5
+
+
+# --- FUNGSI HELPER ---
+
+def normalize_alumni(alumni, jurusan_list):
+    """Isi jurusan_id & kategori dari teks bebas major/status (dipanggil saat input/import)"""
+    major = str(alumni.major or '').strip().lower()
+    status = str(alumni.status or '').strip().lower()
+
+    alumni.jurusan_id = None
+    for j in jurusan_list:
+        if j.nama_jurusan.lower() in major or major == j.kode_jurusan.lower():
+            alumni.jurusan_id = j.id
+            break
+
+    alumni.kategori = None
+    for kategori, pattern in KATEGORI_PATTERNS:
+        if pattern.search(status):
+            alumni.kategori = kategori
+            break
+
+
+# Cache top-N alumni per (jurusan, kategori). Dikosongkan jika versi alumni berubah.
+_saran_cache = {'versi': None, 'data': {}}
+
+
+def get_alumni_suggestions(jurusan_id, kategori):
+    """Top-N alumni (angkatan terbaru) untuk satu jurusan & kategori (memakai index, bukan LIKE)"""
+    versi = get_version(VERSI_ALUMNI)
+    if _saran_cache['versi'] != versi:
+        _saran_cache['data'] = {}
+        _saran_cache['versi'] = versi
+
+    key = (jurusan_id, kategori)
+    if key not in _saran_cache['data']:
+        alumnis = Alumni.query.filter_by(jurusan_id=jurusan_id, kategori=kategori) \
+            .order_by(Alumni.batch.desc(), Alumni.id.desc()).limit(SARAN_LIMIT).all()
+        _saran_cache['data'][key] = [{'name': a.name, 'batch': a.batch, 'status': a.status} for a in alumnis]
+    return _saran_cache['data'][key]
+
 
 @alumni_bp.route('/', methods=['GET'], strict_slashes=False)
 @jwt_required()
@@ -59,7 +110,9 @@ def store():
             batch=data['batch'],
             major=data['major']
         )
+        normalize_alumni(new_a, Jurusan.query.all())
         db.session.add(new_a)
+        bump_version(VERSI_ALUMNI)
         db.session.commit()
         return jsonify({'msg': 'Data alumni ditambah'}), 201
     except Exception as e:
@@ -79,7 +132,9 @@ def update(id):
     alumni.status = data.get('status', alumni.status)
     alumni.batch = data.get('batch', alumni.batch)
     alumni.major = data.get('major', alumni.major)
+    normalize_alumni(alumni, Jurusan.query.all())
 
+    bump_version(VERSI_ALUMNI)
     db.session.commit()
     return jsonify({'msg': 'Data alumni diperbarui'}), 200
 
@@ -92,6 +147,7 @@ def destroy(id):
 
     alumni = Alumni.query.get_or_404(id)
     db.session.delete(alumni)
+    bump_version(VERSI_ALUMNI)
     db.session.commit()
     return jsonify({'msg': 'Data alumni dihapus'}), 200
 
@@ -112,6 +168,7 @@ def bulk_destroy():
     try:
         # Hapus banyak data sekaligus
         Alumni.query.filter(Alumni.id.in_(ids)).delete(synchronize_session=False)
+        bump_version(VERSI_ALUMNI)
         db.session.commit()
         return jsonify({'msg': f'{len(ids)} data alumni berhasil dihapus'}), 200
     except Exception as e:
@@ -158,6 +215,7 @@ def import_alumni():
     file = request.files['file']
     try:
         df = pd.read_excel(file)
+        jurusan_list = Jurusan.query.all()
         count = 0
         for index, row in df.iterrows():
             new_alumni = Alumni(
@@ -166,9 +224,11 @@ def import_alumni():
                 batch=row.get('Tahun Lulus'),
                 major=row.get('Jurusan')
             )
+            normalize_alumni(new_alumni, jurusan_list)
             db.session.add(new_alumni)
             count += 1
 
+        bump_version(VERSI_ALUMNI)
         db.session.commit()
         return jsonify({"msg": f"{count} Data berhasil diimport"}), 200
     except Exception as e:
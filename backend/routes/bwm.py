@@ -1,12 +1,47 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from models import db, Kriteria, BwmComparison, BobotKriteria, User, Setting, RoleEnum
+from models import db, Kriteria, BwmComparison, BobotKriteria, BobotKonsensus, DeviasiPakar, SetBobot, User, Setting, \
+    RoleEnum, ComparisonTypeEnum
+from helpers import bulk_upsert, bump_version, get_versions, VERSI_BOBOT, VERSI_KRITERIA, VERSI_FGD
+from sqlalchemy import func
+from worker import enqueue_recalc
 import math
+from functools import lru_cache
 import numpy as np
-from scipy.optimize import linprog
+from spk_engine.bwm import solve_group_bwm, cr_expert_weights, consistency_ratio, input_consistency_ratio, \
+    analytic_weights, input_cr_threshold, CONSISTENT_TOL
+from solver_pool import run_solver, solve_bwm_pooled, solve_bwm_many, solver_error_response, SolverError, \
+    SolverInfeasible
 
 bwm_bp = Blueprint('bwm', __name__)
 
+# Mode agregasi bobot antar pakar (Setting 'bwm_mode'):
+# 'rata_rata' -> rata-rata BobotKriteria tiap pakar (default)
+# 'grup'      -> Group BWM, satu LP gabungan semua perbandingan pakar
+# 'grup_cr'   -> Group BWM, batasan tiap pakar diberi bobot sesuai CR-nya
+BWM_MODE_KEY = 'bwm_mode'
+BWM_MODES = ('rata_rata', 'grup', 'grup_cr')
+
+
+def get_bwm_mode():
+    setting = Setting.query.filter_by(key=BWM_MODE_KEY).first()
+    return setting.value if setting and setting.value in BWM_MODES else 'rata_rata'
+
+
+# Set bobot aktif per scope (umum / per jurusan) ditunjuk oleh Setting 'bobot_aktif:<scope>'.
+# Simpan baru = set baru + pindah pointer (satu statement), set lama tetap tersimpan sebagai riwayat.
+BOBOT_AKTIF_PREFIX = 'bobot_aktif:'
+
+
+def bobot_scope_key(jurusan_id):
+    return f"{BOBOT_AKTIF_PREFIX}jurusan:{jurusan_id}" if jurusan_id else f"{BOBOT_AKTIF_PREFIX}umum"
+
+
+def get_active_set_ids():
+    """ID set bobot yang sedang aktif di semua scope"""
+    rows = db.session.query(Setting.value).filter(Setting.key.like(f"{BOBOT_AKTIF_PREFIX}%")).all()
+    return [int(value) for (value,) in rows if value]
+
 
 # --- ADMIN ROUTES: SETTING FGD ---
 
@@ -30,6 +65,7 @@ def get_admin_setting():
         } for k in kriteria_list],
         'current_best': int(best_setting.value) if best_setting and best_setting.value else None,
         'current_worst': int(worst_setting.value) if worst_setting and worst_setting.value else None,
+        'mode': get_bwm_mode(),
     })
 
 
@@ -44,6 +80,7 @@ def save_admin_setting():
     data = request.get_json()
     best_id = data.get('best_id')
     worst_id = data.get('worst_id')
+    mode = data.get('mode', get_bwm_mode())
 
     if not best_id or not worst_id:
         return jsonify({'msg': 'Best dan Worst harus dipilih!'}), 400
@@ -51,6 +88,18 @@ def save_admin_setting():
     if best_id == worst_id:
         return jsonify({'msg': 'Best dan Worst tidak boleh sama!'}), 400
 
+    if mode not in BWM_MODES:
+        return jsonify({'msg': 'Mode agregasi tidak dikenal.'}), 400
+
+    # Konsensus Group BWM untuk Best/Worst yang baru di-solve dulu, sebelum ada penulisan
+    group_result = None
+    if mode != 'rata_rata':
+        try:
+            group_result = solve_group_weights(int(best_id), int(worst_id), use_cr=(mode == 'grup_cr'))
+        except SolverError as e:
+            db.session.rollback()
+            return solver_error_response(e)
+
     # Simpan ke tabel Settings
     # Helper function untuk update_or_create
     def update_setting(key, val):
@@ -62,9 +111,134 @@ def save_admin_setting():
 
     update_setting('bwm_best_id', best_id)
     update_setting('bwm_worst_id', worst_id)
+    update_setting(BWM_MODE_KEY, mode)
+    bump_version(VERSI_FGD)  # Invalidate bundle konteks pakar
+
+    if mode != 'rata_rata':
+        write_group_weights(group_result)
+    bump_version(VERSI_BOBOT)
+    job = enqueue_recalc('bwm')
 
     db.session.commit()
-    return jsonify({'msg': 'Hasil FGD berhasil dikunci!'}), 200
+    return jsonify({'msg': 'Hasil FGD berhasil dikunci!', 'job_id': job.id if job else None}), 200
+
+
+@bwm_bp.route('/admin/konsensus', methods=['GET'])
+@jwt_required()
+def get_konsensus():
+    """Bobot konsensus Group BWM & deviasi tiap pakar terhadapnya"""
+    claims = get_jwt()
+    if claims.get('role') != 'admin':
+        return jsonify({'msg': 'Unauthorized'}), 403
+
+    bobot = db.session.query(Kriteria.kode, BobotKonsensus.nilai_bobot) \
+        .join(BobotKonsensus, BobotKonsensus.kriteria_id == Kriteria.id) \
+        .order_by(Kriteria.kode.asc()).all()
+    deviasi = DeviasiPakar.query.join(User, User.id == DeviasiPakar.pakar_id).all()
+
+    return jsonify({
+        'mode': get_bwm_mode(),
+        'bobot': {kode: nilai for kode, nilai in bobot},
+        'pakar': [{
+            'pakar_id': d.pakar_id,
+            'nama': d.pakar.name,
+            'jenis_pakar': d.pakar.jenis_pakar,
+            'cr': d.cr,
+            'bobot_pakar': d.bobot_pakar,
+            'deviasi': d.deviasi
+        } for d in deviasi]
+    }), 200
+
+
+@bwm_bp.route('/admin/cache-stats', methods=['GET'])
+@jwt_required()
+def get_cache_stats():
+    """Statistik cache solusi LP BWM (hit/miss) untuk menentukan ukuran cache"""
+    claims = get_jwt()
+    if claims.get('role') != 'admin':
+        return jsonify({'msg': 'Unauthorized'}), 403
+
+    info = _solve_bwm_cached.cache_info()
+    total = info.hits + info.misses
+
+    return jsonify({
+        'hits': info.hits,
+        'misses': info.misses,
+        'hit_rate': round(info.hits / total, 4) if total else 0.0,
+        'size': info.currsize,
+        'max_size': info.maxsize
+    }), 200
+
+
+# --- BUNDLE KONTEKS PAKAR (CACHE) ---
+# Per jenis_pakar: Best/Worst global, kriteria tanggung jawab & mapping kode.
+# Dibangun ulang jika hasil FGD dikunci ulang atau kriteria diubah.
+_context_cache = {'versi': None, 'bundles': {}}
+
+
+def build_pakar_bundle(jenis_pakar):
+    best_s = Setting.query.filter_by(key='bwm_best_id').first()
+    worst_s = Setting.query.filter_by(key='bwm_worst_id').first()
+
+    global_best = Kriteria.query.get(int(best_s.value)) if best_s and best_s.value else None
+    global_worst = Kriteria.query.get(int(worst_s.value)) if worst_s and worst_s.value else None
+    if not global_best or not global_worst:
+        return {'ready': False}
+
+    # Filter Kriteria Sesuai Role
+    # Logic: Guru BK -> 'gurubk' & 'umum', Kaprodi -> 'kaprodi' & 'umum'
+    query = Kriteria.query
+    if jenis_pakar == 'gurubk':
+        query = query.filter(Kriteria.penanggung_jawab.in_(['gurubk', 'umum']))
+    elif jenis_pakar == 'kaprodi':
+        query = query.filter(Kriteria.penanggung_jawab.in_(['kaprodi', 'umum']))
+
+    role_kriteria = query.all()
+
+    # Set perhitungan: kriteria role + Best & Worst global
+    target_kriteria = list(role_kriteria)
+    if global_best not in target_kriteria:
+        target_kriteria.append(global_best)
+    if global_worst not in target_kriteria:
+        target_kriteria.append(global_worst)
+
+    kriteria_map = {str(k.id): k.kode for k in target_kriteria}
+
+    return {
+        'ready': True,
+        'best_id': global_best.id,
+        'worst_id': global_worst.id,
+        'best_code': global_best.kode,
+        'worst_code': global_worst.kode,
+        'global_best': {'id': global_best.id, 'kode': global_best.kode, 'nama': global_best.nama},
+        'global_worst': {'id': global_worst.id, 'kode': global_worst.kode, 'nama': global_worst.nama},
+        'kriteria_list': [{'id': k.id, 'kode': k.kode, 'nama': k.nama}
+                          for k in sorted(role_kriteria, key=lambda k: k.kode)],
+        'kriteria_map': kriteria_map,
+        'code_to_id': {k.kode: k.id for k in target_kriteria},
+        'criteria_codes': list(kriteria_map.values())
+    }
+
+
+def get_pakar_bundle(jenis_pakar):
+    """Bundle konteks pakar dari cache (satu query cek versi)"""
+    versions = get_versions(VERSI_KRITERIA, VERSI_FGD)
+    versi = (versions[VERSI_KRITERIA], versions[VERSI_FGD])
+
+    if _context_cache['versi'] != versi:
+        _context_cache['bundles'] = {}
+        _context_cache['versi'] = versi
+
+    bundle = _context_cache['bundles'].get(jenis_pakar)
+    if bundle is None:
+        bundle = build_pakar_bundle(jenis_pakar)
+        _context_cache['bundles'][jenis_pakar] = bundle
+    return bundle
+
+
+def map_comparisons(values, kriteria_map):
+    """Input {kriteria_id: nilai} -> {kode: nilai}, hanya kriteria dalam set perhitungan"""
+    return {kriteria_map[kid_str]: val for kid_str, val in values.items() if kid_str in kriteria_map}
 
 
 # --- PAKAR ROUTES: INPUT & HITUNG ---
@@ -81,31 +255,16 @@ def get_pakar_context():
     user_id = get_jwt_identity()
     user = User.query.get(user_id)
 
-    # 1. Ambil Setting Global
-    best_s = Setting.query.filter_by(key='bwm_best_id').first()
-    worst_s = Setting.query.filter_by(key='bwm_worst_id').first()
-
-    if not best_s or not worst_s:
+    # 1 & 2. Best/Worst global + kriteria sesuai role (dari cache bundle)
+    bundle = get_pakar_bundle(user.jenis_pakar)
+    if not bundle['ready']:
         return jsonify({'ready': False, 'msg': 'Admin belum menentukan hasil FGD.'}), 200
 
-    global_best = Kriteria.query.get(int(best_s.value))
-    global_worst = Kriteria.query.get(int(worst_s.value))
-
-    # 2. Filter Kriteria Sesuai Role
-    # Logic: Guru BK -> 'gurubk' & 'umum', Kaprodi -> 'kaprodi' & 'umum'
-    query = Kriteria.query
-    if user.jenis_pakar == 'gurubk':
-        query = query.filter(Kriteria.penanggung_jawab.in_(['gurubk', 'umum']))
-    elif user.jenis_pakar == 'kaprodi':
-        query = query.filter(Kriteria.penanggung_jawab.in_(['kaprodi', 'umum']))
-
-    kriteria_list = query.order_by(Kriteria.kode.asc()).all()
-
     # 3. Ambil Inputan Lama (History)
-    saved_comparisons = BwmComparison.query.filter_by(
-        pakar_id=user_id,
-        best_criterion_id=global_best.id
-    ).all()
+    # Set terakhir pakar ini untuk Best global aktif
+    latest_set = db.session.query(func.max(SetBobot.id)) \
+        .filter_by(pakar_id=user_id, best_criterion_id=bundle['best_id']).scalar_subquery()
+    saved_comparisons = BwmComparison.query.filter(BwmComparison.set_bobot_id == latest_set).all()
 
     saved_best_to_others = {}
     saved_others_to_worst = {}
@@ -119,89 +278,195 @@ def get_pakar_context():
     return jsonify({
         'ready': True,
         'user_role': user.jenis_pakar,
-        'global_best': {'id': global_best.id, 'kode': global_best.kode, 'nama': global_best.nama},
-        'global_worst': {'id': global_worst.id, 'kode': global_worst.kode, 'nama': global_worst.nama},
-        'kriteria_list': [{'id': k.id, 'kode': k.kode, 'nama': k.nama} for k in kriteria_list],
+        'global_best': bundle['global_best'],
+        'global_worst': bundle['global_worst'],
+        'kriteria_list': bundle['kriteria_list'],
         'saved_best_to_others': saved_best_to_others,
         'saved_others_to_worst': saved_others_to_worst
     })
 
 
 # --- HELPER CALCULATION ---
+
+# Jumlah solusi LP yang disimpan (preview pakar memanggil /calculate hampir tiap perubahan input)
+BWM_CACHE_SIZE = 512
+
+
+@lru_cache(maxsize=BWM_CACHE_SIZE)
+def _solve_bwm_cached(criteria_codes, best_code, worst_code, a_b, a_w, a_bw):
+    """
+    Solve BWM untuk input kanonik (tuple, hashable) -> (weights tuple, cr, ksi).
+    Dibungkus lru_cache: input yang sama tidak di-solve ulang.
+    """
+    # Analitik jika konsisten penuh, selain itu LP sparse di process pool solver
+    solution = solve_bwm_pooled(a_b, a_w, criteria_codes.index(best_code), criteria_codes.index(worst_code))
+    if solution is None:
+        raise Exception("Optimasi BWM gagal menemukan solusi.")
+
+    weights, ksi = solution
+
+    # Hitung CR (Consistency Ratio) sesuai Tabel 2.1 Proposal Hal 29
+    cr = consistency_ratio(ksi, a_bw)
+
+    return tuple(float(w) for w in weights), cr, ksi
+
+
+def comparison_vectors(criteria_codes, best_to_others, others_to_worst):
+    """Bentuk kanonik input: kode diurutkan, nilai perbandingan jadi float (default 1)"""
+    codes = tuple(sorted(criteria_codes))
+    a_b = tuple(float(best_to_others.get(str(code), 1)) for code in codes)
+    a_w = tuple(float(others_to_worst.get(str(code), 1)) for code in codes)
+    return codes, a_b, a_w
+
+
+def calculate_input_preview(criteria_codes, best_code, worst_code, best_to_others, others_to_worst):
+    """
+    Preview tanpa solver, O(n), untuk umpan balik langsung saat pakar mengetik.
+    Return: (bobot analitik {kode: bobot}, CR berbasis input, ambang CR input untuk a_BW & n)
+    Bobot analitik eksak jika input konsisten penuh, selain itu perkiraan (w_j sebanding 1 / a_Bj).
+    """
+    codes, a_b, a_w = comparison_vectors(criteria_codes, best_to_others, others_to_worst)
+    best_idx, worst_idx = codes.index(best_code), codes.index(worst_code)
+    cr_input = input_consistency_ratio(a_b, a_w, best_idx, worst_idx)
+    weights = analytic_weights(a_b, best_idx)
+    return dict(zip(codes, weights.tolist())), cr_input, input_cr_threshold(a_b[worst_idx], len(codes))
+
+
 def calculate_bwm_weights(criteria_codes, best_code, worst_code, best_to_others, others_to_worst):
     """
     Menghitung bobot BWM menggunakan Linear Programming Rezaei (2016).
     Sesuai revisi rumus Bab 2 Persamaan 2.3.
+    Input konsisten penuh memakai solusi analitik (tanpa LP, lihat spk_engine.bwm.solve_bwm).
+    Hasil di-cache (LRU) per bentuk kanonik input: kode diurutkan, nilai dijadikan float.
     """
-    n = len(criteria_codes)
-    idx = {code: i for i, code in enumerate(criteria_codes)}
-
-    # Variabel keputusan: [w1, w2, ..., wn, ksi]
-    c = [0] * n + [1]
-
-    A_ub = []
-    b_ub = []
-
-    # Batasan Best-to-Others: |wb - abj * wj| <= ksi
-    for code in criteria_codes:
-        j_idx = idx[code]
-        b_idx = idx[best_code]
-        a_bj = float(best_to_others.get(str(code), 1))
-
-        # wb - a_bj*wj - ksi <= 0
-        row1 = [0] * (n + 1)
-        row1[b_idx], row1[j_idx], row1[n] = 1, -a_bj, -1
-        A_ub.append(row1)
-        b_ub.append(0)
-
-        # -wb + a_bj*wj - ksi <= 0
-        row2 = [0] * (n + 1)
-        row2[b_idx], row2[j_idx], row2[n] = -1, a_bj, -1
-        A_ub.append(row2)
-        b_ub.append(0)
-
-    # Batasan Others-to-Worst: |wj - ajw * ww| <= ksi
-    for code in criteria_codes:
-        j_idx = idx[code]
-        w_idx = idx[worst_code]
-        a_jw = float(others_to_worst.get(str(code), 1))
-
-        # wj - a_jw*ww - ksi <= 0
-        row1 = [0] * (n + 1)
-        row1[j_idx], row1[w_idx], row1[n] = 1, -a_jw, -1
-        A_ub.append(row1)
-        b_ub.append(0)
-
-        # -wj + a_jw*ww - ksi <= 0
-        row2 = [0] * (n + 1)
-        row2[j_idx], row2[w_idx], row2[n] = -1, a_jw, -1
-        A_ub.append(row2)
-        b_ub.append(0)
-
-    # Batasan Equality: Sum(wj) = 1
-    A_eq = [[1] * n + [0]]
-    b_eq = [1]
-
-    # Batasan Lower Bound: wj >= 0, ksi >= 0
-    bounds = [(0, None)] * (n + 1)
-
-    # Solve menggunakan solver 'highs' yang stabil
-    res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
-
-    if not res.success:
-        raise Exception("Optimasi BWM gagal menemukan solusi.")
+    # a_BW dicari per kode kriteria (sama dengan pakar_consistency_ratios), bukan per indeks
+    a_bw = float(best_to_others.get(str(worst_code), 9))
 
-    weights = res.x[:n]
-    ksi = res.x[-1]
+    codes, a_b, a_w = comparison_vectors(criteria_codes, best_to_others, others_to_worst)
 
-    # Hitung CR (Consistency Ratio) sesuai Tabel 2.1 Proposal Hal 29
-    ci_table = {1: 0, 2: 0.44, 3: 1.0, 4: 1.63, 5: 2.3, 6: 3.0, 7: 3.73, 8: 4.47, 9: 5.23}
-    a_bw = float(best_to_others.get(str(idx[worst_code]), 9))
-    ci = ci_table.get(int(a_bw), 5.23)
+    weights, cr, ksi = _solve_bwm_cached(codes, best_code, worst_code, a_b, a_w, a_bw)
 
-    cr = ksi / ci if ci > 0 else 0
+    return dict(zip(codes, weights)), cr, ksi
 
-    return {code: float(w) for code, w in zip(criteria_codes, weights)}, cr, ksi
+
+def pakar_consistency_ratios(a_b, a_w, best_idx, worst_idx, known_crs):
+    """
+    CR (ksi / CI) tiap pakar untuk pembobotan grup_cr. CR yang sudah diketahui dipakai langsung,
+    selain itu di-solve dari perbandingan pakar itu sendiri. Solve gagal -> CR 1 (bobot terendah).
+    """
+    crs = list(known_crs)
+    missing = [e for e, cr in enumerate(crs) if cr is None]
+    if not missing:
+        return crs
+
+    arg_list = []
+    for e in missing:
+        cols = np.union1d(np.flatnonzero(~np.isnan(a_b[e]) | ~np.isnan(a_w[e])), [best_idx, worst_idx])
+        arg_list.append((np.nan_to_num(a_b[e, cols], nan=1.0), np.nan_to_num(a_w[e, cols], nan=1.0),
+                         int(np.searchsorted(cols, best_idx)), int(np.searchsorted(cols, worst_idx))))
+
+    for e, args, solution in zip(missing, arg_list, solve_bwm_many(arg_list)):
+        sub_b, _, _, sub_worst = args
+        crs[e] = consistency_ratio(solution[1], sub_b[sub_worst]) if solution is not None else 1.0
+    return crs
+
+
+def solve_group_weights(best_id, worst_id, use_cr=False, override=None):
+    """
+    Group BWM tahap baca & solve (tanpa penulisan): semua perbandingan pakar (untuk Best/Worst aktif)
+    di-solve dalam satu LP. override = (pakar_id, {tipe: {kriteria_id: nilai}}, cr) menggantikan set
+    terakhir pakar tsb di memori (dipakai /save sebelum set barunya ditulis).
+    Return: hasil solve untuk write_group_weights, atau None jika belum ada perbandingan.
+    """
+    # Hanya set terakhir tiap pakar untuk Best/Worst ini
+    latest_sets = db.session.query(func.max(SetBobot.id)) \
+        .filter_by(best_criterion_id=best_id, worst_criterion_id=worst_id).group_by(SetBobot.pakar_id)
+    comparisons = [(int(c.pakar_id), ComparisonTypeEnum(c.comparison_type), int(c.compared_criterion_id),
+                    float(c.value))
+                   for c in BwmComparison.query.filter(BwmComparison.set_bobot_id.in_(latest_sets)).all()]
+    set_map = {int(s.pakar_id): s for s in SetBobot.query.filter(SetBobot.id.in_(latest_sets)).all()}
+    known_crs = {pid: s.cr for pid, s in set_map.items()}
+
+    if override:
+        override_pid, override_values, override_cr = override
+        comparisons = [c for c in comparisons if c[0] != override_pid]
+        for comparison_type, values in override_values.items():
+            comparisons.extend((override_pid, comparison_type, int(kid), float(val)) for kid, val in values.items())
+        known_crs[override_pid] = override_cr
+
+    if not comparisons:
+        return None
+
+    # Kriteria yang dibandingkan minimal oleh satu pakar (+ Best & Worst)
+    kriteria_ids = sorted({c[2] for c in comparisons} | {best_id, worst_id})
+    k_index = {kid: i for i, kid in enumerate(kriteria_ids)}
+    pakar_ids = sorted({c[0] for c in comparisons})
+    p_index = {pid: i for i, pid in enumerate(pakar_ids)}
+
+    # Matriks perbandingan pakar x kriteria (NaN = tidak dibandingkan pakar tsb)
+    a_b = np.full((len(pakar_ids), len(kriteria_ids)), np.nan)
+    a_w = np.full((len(pakar_ids), len(kriteria_ids)), np.nan)
+    for pid, comparison_type, kid, val in comparisons:
+        target = a_b if comparison_type == ComparisonTypeEnum.best_to_others else a_w
+        target[p_index[pid], k_index[kid]] = val
+
+    # Sisi yang tidak diisi dianggap 1 (sama seperti solve per pakar)
+    compared = ~np.isnan(a_b) | ~np.isnan(a_w)
+    a_b = np.where(compared & np.isnan(a_b), 1, a_b)
+    a_w = np.where(compared & np.isnan(a_w), 1, a_w)
+
+    expert_weights = None
+    missing_crs = {}
+    if use_cr:
+        # CR dari set yang dipakai; set tanpa CR (misal hasil backfill migrasi) dihitung dari perbandingannya,
+        # bukan dianggap konsisten penuh (CR 0 = bobot terbesar)
+        crs = pakar_consistency_ratios(a_b, a_w, k_index[best_id], k_index[worst_id],
+                                       [known_crs.get(pid) for pid in pakar_ids])
+        missing_crs = {pid: cr for pid, cr in zip(pakar_ids, crs) if known_crs.get(pid) is None}
+        expert_weights = cr_expert_weights(crs)
+
+    solution = run_solver(solve_group_bwm, a_b, a_w, k_index[best_id], k_index[worst_id], expert_weights)
+    if solution is None:
+        raise SolverInfeasible("Optimasi Group BWM gagal menemukan solusi.")
+    weights, ksi, deviations = solution
+
+    return {
+        'kriteria_ids': kriteria_ids, 'pakar_ids': pakar_ids, 'weights': weights,
+        'deviations': deviations, 'expert_weights': expert_weights,
+        'missing_crs': {set_map[pid].id: cr for pid, cr in missing_crs.items() if pid in set_map}
+    }
+
+
+def write_group_weights(result):
+    """
+    Group BWM tahap tulis: ganti BobotKonsensus & deviasi tiap pakar dari hasil solve_group_weights.
+    Tidak melakukan commit. Return: dict {kode: bobot} atau None jika belum ada perbandingan.
+    """
+    BobotKonsensus.query.delete()
+    if result is None:
+        return None
+
+    kriteria_ids, pakar_ids = result['kriteria_ids'], result['pakar_ids']
+    weights, expert_weights = result['weights'], result['expert_weights']
+
+    for kid, w in zip(kriteria_ids, weights):
+        db.session.add(BobotKonsensus(kriteria_id=kid, nilai_bobot=float(w)))
+
+    deviasi_rows = {int(d.pakar_id): d for d in DeviasiPakar.query.filter(DeviasiPakar.pakar_id.in_(pakar_ids)).all()}
+    for i, pid in enumerate(pakar_ids):
+        row = deviasi_rows.get(pid)
+        if not row:
+            row = DeviasiPakar(pakar_id=pid)
+            db.session.add(row)
+        row.bobot_pakar = float(expert_weights[i]) if expert_weights is not None else 1.0
+        row.deviasi = float(result['deviations'][i])
+
+    # Simpan CR yang baru dihitung agar solve berikutnya tidak mengulang
+    for set_id, cr in result['missing_crs'].items():
+        SetBobot.query.filter_by(id=set_id).update({'cr': cr}, synchronize_session=False)
+
+    kode_map = dict(db.session.query(Kriteria.id, Kriteria.kode).filter(Kriteria.id.in_(kriteria_ids)).all())
+    return {kode_map[kid]: float(w) for kid, w in zip(kriteria_ids, weights)}
 
 
 @bwm_bp.route('/calculate', methods=['POST'])
@@ -214,60 +479,44 @@ def calculate_bwm_preview():
     user = User.query.get(user_id)
     data = request.get_json()
 
-    # Ambil Context (Best/Worst Global)
-    best_s = Setting.query.filter_by(key='bwm_best_id').first()
-    worst_s = Setting.query.filter_by(key='bwm_worst_id').first()
-
-    if not best_s or not worst_s:
+    # Ambil Context (Best/Worst Global & kriteria role) dari cache bundle
+    bundle = get_pakar_bundle(user.jenis_pakar)
+    if not bundle['ready']:
         return jsonify({'msg': 'Setting BWM belum ditemukan.'}), 400
 
-    best_id = int(best_s.value)
-    worst_id = int(worst_s.value)
-
-    # Filter Kriteria Sesuai Role (Sama seperti saat Save)
-    query = Kriteria.query
-    if user.jenis_pakar == 'gurubk':
-        query = query.filter(Kriteria.penanggung_jawab.in_(['gurubk', 'umum']))
-    elif user.jenis_pakar == 'kaprodi':
-        query = query.filter(Kriteria.penanggung_jawab.in_(['kaprodi', 'umum']))
-
-    target_kriteria = query.all()
-
-    # Pastikan Best & Worst ikut
-    global_best_obj = Kriteria.query.get(best_id)
-    global_worst_obj = Kriteria.query.get(worst_id)
-
-    if global_best_obj not in target_kriteria:
-        target_kriteria.append(global_best_obj)
-    if global_worst_obj not in target_kriteria:
-        target_kriteria.append(global_worst_obj)
-
-    # Mapping
-    kriteria_map = {str(k.id): k.kode for k in target_kriteria}
-    best_code = global_best_obj.kode
-    worst_code = global_worst_obj.kode
-    criteria_codes = list(kriteria_map.values())
-
     # Ambil Input User
-    best_to_others_input = data.get('best_to_others', {})
-    others_to_worst_input = data.get('others_to_worst', {})
+    bto_mapped = map_comparisons(data.get('best_to_others', {}), bundle['kriteria_map'])
+    otw_mapped = map_comparisons(data.get('others_to_worst', {}), bundle['kriteria_map'])
 
-    bto_mapped = {}
-    otw_mapped = {}
-
-    for kid_str, val in best_to_others_input.items():
-        if kid_str in kriteria_map:
-            bto_mapped[kriteria_map[kid_str]] = val
-
-    for kid_str, val in others_to_worst_input.items():
-        if kid_str in kriteria_map:
-            otw_mapped[kriteria_map[kid_str]] = val
+    args = (bundle['criteria_codes'], bundle['best_code'], bundle['worst_code'], bto_mapped, otw_mapped)
 
     try:
-        final_weights, cr, ksi = calculate_bwm_weights(
-            criteria_codes, best_code, worst_code, bto_mapped, otw_mapped
-        )
-        return jsonify({'cr': cr, 'msg': 'OK'}), 200
+        # Fast path: CR berbasis input + bobot analitik, tanpa solver. cr_input punya ambangnya
+        # sendiri (cr_input_batas); 'cr' (skala LP, divalidasi /save) hanya dikirim saat final.
+        weights, cr_input, cr_input_batas = calculate_input_preview(*args)
+        konsisten = cr_input <= CONSISTENT_TOL
+        if not data.get('final'):
+            return jsonify({
+                'cr_input': cr_input,
+                'cr_input_batas': cr_input_batas,
+                'weights': weights,
+                'metode': 'analitik' if konsisten else 'input',
+                'msg': 'OK'
+            }), 200
+
+        # Bobot final diminta: LP (atau solusi analitik jika konsisten penuh)
+        final_weights, cr, ksi = calculate_bwm_weights(*args)
+        return jsonify({
+            'cr': cr,
+            'cr_input': cr_input,
+            'cr_input_batas': cr_input_batas,
+            'ksi': ksi,
+            'weights': final_weights,
+            'metode': 'analitik' if konsisten else 'lp',
+            'msg': 'OK'
+        }), 200
+    except SolverError as e:
+        return solver_error_response(e)
     except Exception as e:
         return jsonify({'msg': str(e), 'cr': None}), 400
 
@@ -283,95 +532,30 @@ def save_bwm():
     user = User.query.get(user_id)
     data = request.get_json()
 
-    # Ambil Best & Worst dari DB (Bukan dari Input User, biar aman)
-    best_s = Setting.query.filter_by(key='bwm_best_id').first()
-    worst_s = Setting.query.filter_by(key='bwm_worst_id').first()
-
-    if not best_s or not worst_s:
+    # Ambil Best & Worst dari DB (Bukan dari Input User, biar aman) -> cache bundle
+    bundle = get_pakar_bundle(user.jenis_pakar)
+    if not bundle['ready']:
         return jsonify({'msg': 'Setting BWM belum ditemukan.'}), 400
 
-    best_id = int(best_s.value)
-    worst_id = int(worst_s.value)
+    best_id = bundle['best_id']
+    worst_id = bundle['worst_id']
 
     best_to_others_input = data.get('best_to_others', {})
     others_to_worst_input = data.get('others_to_worst', {})
 
     try:
         # A. PERSIAPAN DATA
-        # Ambil semua kriteria untuk mapping
-        # NOTE: Kita harus pakai kriteria yg relevan dengan Pakar ini untuk perhitungan bobotnya
-        # Tapi secara teknis BWM butuh 'semua' item dalam satu set perbandingan.
-        # Jika sistem memisahkan bobot per user, kita ambil kriteria user ini saja.
-
-        # Sesuai logika Laravel: Ambil kriteria tanggung jawab user
-        query = Kriteria.query
-        if user.jenis_pakar == 'gurubk':
-            query = query.filter(Kriteria.penanggung_jawab.in_(['gurubk', 'umum']))
-        elif user.jenis_pakar == 'kaprodi':
-            query = query.filter(Kriteria.penanggung_jawab.in_(['kaprodi', 'umum']))
-
-        target_kriteria = query.all()
-
-        # Kita butuh mapping ID -> Kode
-        kriteria_map = {str(k.id): k.kode for k in target_kriteria}
-        code_to_id = {k.kode: k.id for k in target_kriteria}
-
-        # Ambil kode Best & Worst Global
-        global_best_obj = Kriteria.query.get(best_id)
-        global_worst_obj = Kriteria.query.get(worst_id)
-
-        if global_best_obj not in target_kriteria:
-            target_kriteria.append(global_best_obj)
-        if global_worst_obj not in target_kriteria:
-            target_kriteria.append(global_worst_obj)
-
-        kriteria_map = {str(k.id): k.kode for k in target_kriteria}
-        code_to_id = {k.kode: k.id for k in target_kriteria}
-
-        best_code = global_best_obj.kode
-        worst_code = global_worst_obj.kode
-
-        criteria_codes = list(kriteria_map.values())
-
-        # Pastikan Best & Worst masuk dalam list calculation (kalau mereka termasuk tanggung jawab user)
-        # Jika Best/Worst itu kriteria yang TIDAK diurus user ini, logic bisa agak tricky.
-        # Asumsi: Best & Worst pasti ada di list 'Umum' atau sesuai role.
+        # Set perhitungan = kriteria tanggung jawab user + Best & Worst global (lihat build_pakar_bundle)
+        kriteria_map = bundle['kriteria_map']
+        code_to_id = bundle['code_to_id']
 
         # B. MAPPING INPUT
-        bto_mapped = {}
-        otw_mapped = {}
-
-        # Simpan ke DB (History Comparisons)
-        # Hapus data lama untuk tipe yang sama
-        BwmComparison.query.filter_by(pakar_id=user_id, best_criterion_id=best_id).delete()
-
-        for kid_str, val in best_to_others_input.items():
-            # Simpan DB
-            cmp = BwmComparison(
-                pakar_id=user_id, best_criterion_id=best_id, worst_criterion_id=worst_id,
-                comparison_type='best_to_others', compared_criterion_id=int(kid_str), value=val
-            )
-            db.session.add(cmp)
-
-            # Map untuk Hitung
-            if kid_str in kriteria_map:
-                bto_mapped[kriteria_map[kid_str]] = val
-
-        for kid_str, val in others_to_worst_input.items():
-            # Simpan DB
-            cmp = BwmComparison(
-                pakar_id=user_id, best_criterion_id=best_id, worst_criterion_id=worst_id,
-                comparison_type='others_to_worst', compared_criterion_id=int(kid_str), value=val
-            )
-            db.session.add(cmp)
-
-            # Map untuk Hitung
-            if kid_str in kriteria_map:
-                otw_mapped[kriteria_map[kid_str]] = val
-
-        # C. HITUNG BOBOT
+        bto_mapped = map_comparisons(best_to_others_input, kriteria_map)
+        otw_mapped = map_comparisons(others_to_worst_input, kriteria_map)
+
+        # C. HITUNG BOBOT (sebelum ada penulisan/lock apa pun)
         final_weights, cr, ksi = calculate_bwm_weights(
-            criteria_codes, best_code, worst_code, bto_mapped, otw_mapped
+            bundle['criteria_codes'], bundle['best_code'], bundle['worst_code'], bto_mapped, otw_mapped
         )
 
         # Validasi CR (Consistency Ratio) sesuai Proposal Hal 28
@@ -381,23 +565,69 @@ def save_bwm():
                 'cr': cr
             }), 400
 
-        # D. SIMPAN BOBOT (BobotKriteria)
+        # Mode Group BWM: satu solve gabungan semua pakar (set baru pakar ini menggantikan set lamanya
+        # di memori) menggantikan rata-rata. Solve dilakukan sebelum transaksi tulis dibuka.
+        mode = get_bwm_mode()
+        group_result = None
+        if mode != 'rata_rata':
+            group_result = solve_group_weights(best_id, worst_id, use_cr=(mode == 'grup_cr'), override=(
+                int(user_id),
+                {ComparisonTypeEnum.best_to_others: best_to_others_input,
+                 ComparisonTypeEnum.others_to_worst: others_to_worst_input},
+                cr
+            ))
+
+        # D. SIMPAN SET BOBOT BARU (versi): perbandingan & bobot masing-masing satu multi-row upsert
         jurusan_id = user.jurusan_id if user.jenis_pakar == 'kaprodi' else None
 
-        # Reset Bobot Lama
-        if jurusan_id:
-            BobotKriteria.query.filter_by(jurusan_id=jurusan_id).delete()
-        else:
-            BobotKriteria.query.filter(BobotKriteria.jurusan_id.is_(None)).delete()
-
-        for code, weight_val in final_weights.items():
-            k_id = code_to_id[code]
-            bk = BobotKriteria(kriteria_id=k_id, jurusan_id=jurusan_id, nilai_bobot=weight_val)
-            db.session.add(bk)
+        set_bobot = SetBobot(pakar_id=user_id, jurusan_id=jurusan_id, best_criterion_id=best_id,
+                             worst_criterion_id=worst_id, cr=cr, ksi=ksi)
+        db.session.add(set_bobot)
+        db.session.flush()  # Dapat ID set
+
+        comparison_rows = []
+        for comparison_type, values in ((ComparisonTypeEnum.best_to_others, best_to_others_input),
+                                        (ComparisonTypeEnum.others_to_worst, others_to_worst_input)):
+            for kid_str, val in values.items():
+                comparison_rows.append({
+                    'pakar_id': user_id, 'set_bobot_id': set_bobot.id,
+                    'best_criterion_id': best_id, 'worst_criterion_id': worst_id,
+                    'comparison_type': comparison_type, 'compared_criterion_id': int(kid_str), 'value': val
+                })
+        bulk_upsert(BwmComparison, comparison_rows,
+                    index_elements=['set_bobot_id', 'comparison_type', 'compared_criterion_id'],
+                    update_columns=['value'])
+
+        bulk_upsert(BobotKriteria, [{
+            'kriteria_id': code_to_id[code], 'jurusan_id': jurusan_id,
+            'set_bobot_id': set_bobot.id, 'nilai_bobot': weight_val
+        } for code, weight_val in final_weights.items()],
+            index_elements=['set_bobot_id', 'kriteria_id'], update_columns=['nilai_bobot'])
+
+        # E. Pindahkan pointer set aktif scope ini ke set baru (satu statement atomik)
+        bulk_upsert(Setting, [{'key': bobot_scope_key(jurusan_id), 'value': str(set_bobot.id), 'type': 'pointer'}],
+                    index_elements=['key'], update_columns=['value'])
+
+        # CR pakar disimpan untuk pembobotan Group BWM (mode grup_cr)
+        deviasi = DeviasiPakar.query.filter_by(pakar_id=user_id).first()
+        if not deviasi:
+            deviasi = DeviasiPakar(pakar_id=user_id)
+            db.session.add(deviasi)
+        deviasi.cr = cr
+
+        konsensus = write_group_weights(group_result) if mode != 'rata_rata' else None
+
+        # Invalidate cache bobot agregat (engine MOORA) & jadwalkan hitung ulang hasil siswa
+        bump_version(VERSI_BOBOT)
+        job = enqueue_recalc('bwm')
 
         db.session.commit()
-        return jsonify({'msg': 'Bobot berhasil disimpan!', 'results': final_weights}), 200
+        return jsonify({'msg': 'Bobot berhasil disimpan!', 'results': final_weights, 'konsensus': konsensus,
+                        'job_id': job.id if job else None}), 200
 
+    except SolverError as e:
+        db.session.rollback()
+        return solver_error_response(e)
     except Exception as e:
         db.session.rollback()
         return jsonify({'msg': 'Error: ' + str(e)}), 500
\ No newline at end of file
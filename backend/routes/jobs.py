@@ -0,0 +1,20 @@
+from flask import Blueprint, jsonify
+from flask_jwt_extended import jwt_required, get_jwt
+from models import JobHitung
+from worker import job_to_dict
+
+jobs_bp = Blueprint('jobs', __name__)
+
+
+@jobs_bp.route('/<int:id>', methods=['GET'])
+@jwt_required()
+def show(id):
+    claims = get_jwt()
+    if claims.get('role') not in ['admin', 'pakar']:
+        return jsonify({'msg': 'Akses ditolak'}), 403
+
+    job = JobHitung.query.get(id)
+    if not job:
+        return jsonify({'msg': 'Job tidak ditemukan'}), 404
+
+    return jsonify({'data': job_to_dict(job)})
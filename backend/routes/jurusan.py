@@ -1,6 +1,8 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from models import db, Jurusan, Kriteria, NilaiStaticJurusan, User, RoleEnum
+from helpers import bump_version, VERSI_STATIC
+from worker import enqueue_recalc
 
 jurusan_bp = Blueprint('jurusan', __name__)
 
@@ -144,8 +146,11 @@ def save_static_values(id):
 
             obj.nilai = float(val) if val is not None else 0
 
+        # Invalidate cache tabel nilai statis (engine MOORA) & jadwalkan hitung ulang hasil siswa
+        bump_version(VERSI_STATIC)
+        job = enqueue_recalc('nilai_static')
         db.session.commit()
-        return jsonify({'msg': 'Data nilai statis berhasil disimpan'}), 200
+        return jsonify({'msg': 'Data nilai statis berhasil disimpan', 'job_id': job.id if job else None}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'msg': 'Error saving data: ' + str(e)}), 500
\ No newline at end of file
@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt, get_jwt_identity
 from sqlalchemy import or_
-from models import db, Kriteria, User, Pertanyaan
+from models import db, Kriteria, User, Pertanyaan, JawabanSiswa, NilaiSiswa
+from helpers import bump_version, VERSI_KRITERIA
+from worker import enqueue_recalc
 
 kriteria_bp = Blueprint('kriteria', __name__)
 
@@ -101,8 +103,12 @@ def store():
                 db.session.add(p)
 
         db.session.add(kriteria)
+        # Invalidate cache config kriteria (engine MOORA) & jadwalkan hitung ulang hasil siswa
+        bump_version(VERSI_KRITERIA)
+        job = enqueue_recalc('kriteria')
         db.session.commit()
-        return jsonify({'msg': 'Kriteria berhasil ditambahkan', 'data': {'id': kriteria.id}}), 201
+        return jsonify({'msg': 'Kriteria berhasil ditambahkan', 'data': {'id': kriteria.id},
+                        'job_id': job.id if job else None}), 201
 
     except Exception as e:
         db.session.rollback()
@@ -149,6 +155,13 @@ def update(id):
 
         # Admin & Pakar boleh edit pertanyaan (logic pertanyaan tetap sama)
         if 'list_pertanyaan' in data:
+            # Jawaban pertanyaan lama ikut dihapus; rata-rata NilaiSiswa lama tetap dipakai
+            # sampai siswa menjawab pertanyaan baru (jumlah_jawaban 0 = diganti jawaban baru)
+            pertanyaan_lama = db.session.query(Pertanyaan.id).filter_by(kriteria_id=kriteria.id)
+            JawabanSiswa.query.filter(JawabanSiswa.pertanyaan_id.in_(pertanyaan_lama)) \
+                .delete(synchronize_session=False)
+            NilaiSiswa.query.filter_by(kriteria_id=kriteria.id).update({'jumlah_jawaban': 0},
+                                                                       synchronize_session=False)
             Pertanyaan.query.filter_by(kriteria_id=kriteria.id).delete()
             new_questions = data['list_pertanyaan']
             for teks in new_questions:
@@ -156,8 +169,10 @@ def update(id):
                     p = Pertanyaan(teks=teks, kriteria_id=kriteria.id)
                     db.session.add(p)
 
+        bump_version(VERSI_KRITERIA)
+        job = enqueue_recalc('kriteria')
         db.session.commit()
-        return jsonify({'msg': 'Kriteria berhasil diupdate'}), 200
+        return jsonify({'msg': 'Kriteria berhasil diupdate', 'job_id': job.id if job else None}), 200
 
     except Exception as e:
         db.session.rollback()
@@ -174,7 +189,9 @@ def destroy(id):
     kriteria = Kriteria.query.get_or_404(id)
     try:
         db.session.delete(kriteria)
+        bump_version(VERSI_KRITERIA)
+        job = enqueue_recalc('kriteria')
         db.session.commit()
-        return jsonify({'msg': 'Kriteria dihapus'}), 200
+        return jsonify({'msg': 'Kriteria dihapus', 'job_id': job.id if job else None}), 200
     except Exception as e:
         return jsonify({'msg': 'Gagal menghapus data'}), 400
\ No newline at end of file
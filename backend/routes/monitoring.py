@@ -1,7 +1,9 @@
 from flask import Blueprint, request, jsonify, url_for
 from flask_jwt_extended import jwt_required, get_jwt
 from sqlalchemy import or_, and_, desc, asc
-from models import db, User, HasilRekomendasi, Periode, Jurusan, RoleEnum, RiwayatKelas
+from models import db, User, HasilRekomendasi, Periode, Jurusan, RoleEnum, RiwayatKelas, JobHitung
+from routes.moora import get_engine_versions, versi_signature
+from worker import job_to_dict
 
 monitoring_bp = Blueprint('monitoring', __name__)
 
@@ -128,6 +130,12 @@ def index():
         pagination = query.order_by(desc(HasilRekomendasi.created_at)) \
             .paginate(page=page, per_page=10, error_out=False)
 
+        # Hasil dianggap basi (stale) jika dihitung dengan versi input/bobot/kriteria lama.
+        # Hanya untuk periode aktif: job hitung ulang tidak menyentuh periode historis,
+        # hasil periode lama memang dibekukan dengan bobot saat itu.
+        periode_aktif = bool(periode and periode.is_active)
+        versions = get_engine_versions() if periode_aktif else None
+
         for item in pagination.items:
             data_items.append({
                 'id': item.id,
@@ -144,7 +152,8 @@ def index():
                 'skor_studi': item.skor_studi,
                 'skor_kerja': item.skor_kerja,
                 'skor_wirausaha': item.skor_wirausaha,
-                'catatan_guru_bk': item.catatan_guru_bk
+                'catatan_guru_bk': item.catatan_guru_bk,
+                'is_stale': periode_aktif and item.versi_hitung != versi_signature(item.versi_input, versions)
             })
 
     else:
@@ -199,9 +208,16 @@ def index():
     all_periodes = Periode.query.order_by(desc(Periode.is_active), desc(Periode.nama_periode)).all()
     periodes_data = [{'id': p.id, 'nama_periode': p.nama_periode, 'is_active': p.is_active} for p in all_periodes]
 
+    # 6. Job hitung ulang yang sedang berjalan/antri untuk periode ini (jika ada)
+    job_aktif = JobHitung.query.filter(
+        JobHitung.periode_id == current_periode_id,
+        JobHitung.status.in_(['pending', 'running'])
+    ).order_by(desc(JobHitung.id)).first()
+
     return jsonify({
         'results': response_results,
-        'periodes': periodes_data
+        'periodes': periodes_data,
+        'recalc_job': job_to_dict(job_aktif) if job_aktif else None
     })
 
 
@@ -1,137 +1,364 @@
 from flask import Blueprint, jsonify, request
-from flask_jwt_extended import jwt_required, get_jwt_identity
+from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
 # PENTING: Tambahkan import RiwayatKelas
-from models import db, User, Kriteria, NilaiSiswa, NilaiStaticJurusan, BobotKriteria, HasilRekomendasi, Periode, Alumni, \
-    RiwayatKelas
-from sqlalchemy import desc
-import math
+from models import db, User, Kriteria, NilaiSiswa, NilaiStaticJurusan, BobotKriteria, BobotKonsensus, HasilRekomendasi, \
+    Periode, RiwayatKelas, RoleEnum, SumberNilaiEnum, Jurusan
+from routes.alumni import get_alumni_suggestions
+from routes.bwm import get_bwm_mode, get_active_set_ids
+from siswa_context import get_siswa_context, load_siswa_context
+from helpers import bulk_upsert, get_version, get_versions, VERSI_KRITERIA, VERSI_BOBOT, VERSI_STATIC
+from sqlalchemy import desc, func, and_, insert
 import numpy as np
+from spk_engine import vector_normalize, ratio_scores
 
 moora_bp = Blueprint('moora', __name__)
+moora_bp.before_request(load_siswa_context)
 
-
-# --- FUNGSI HELPER ---
-
-def ensure_static_values(user_id):
-    """Memastikan nilai ketersediaan lapangan kerja (C6) masuk ke NilaiSiswa"""
-    user = User.query.get(user_id)
-    if not user or not user.jurusan_id:
-        return
-    kriteria_statis = Kriteria.query.filter_by(sumber_nilai='static_jurusan').all()
-    for k in kriteria_statis:
-        existing = NilaiSiswa.query.filter_by(siswa_id=user_id, kriteria_id=k.id).first()
-        if not existing:
-            static_val = NilaiStaticJurusan.query.filter_by(jurusan_id=user.jurusan_id, kriteria_id=k.id).first()
-            val_to_insert = static_val.nilai if static_val else 3  # Default 3 (Cukup)
-            db.session.add(NilaiSiswa(siswa_id=user_id, kriteria_id=k.id, nilai_input=val_to_insert))
-    db.session.commit()
-
-
-def get_aggregated_weights():
-    """Mengambil bobot BWM optimal dari tabel BobotKriteria"""
-    kriterias = Kriteria.query.all()
-    weights = {}
-    for k in kriterias:
-        stored = BobotKriteria.query.filter_by(kriteria_id=k.id).all()
-        if stored:
-            # Rata-rata bobot jika ada lebih dari 1 pakar
-            weights[k.kode] = sum(s.nilai_bobot for s in stored) / len(stored)
-        else:
-            weights[k.kode] = 1.0 / len(kriterias)
-    return weights
+ALTERNATIF_NAMES = ['Melanjutkan Studi', 'Bekerja', 'Berwirausaha']
+JALUR_NAMES = ['studi', 'kerja', 'wirausaha']
 
 
-def calculate_ranking(periode_id, user_id):
-    ensure_static_values(user_id)
-    # siswa = User.query.get(user_id) # Tidak lagi mengambil kelas dari tabel User
+# --- FUNGSI HELPER ---
 
-    # 1. Ambil Kriteria & Config dari DB
-    all_kriteria = Kriteria.query.order_by(Kriteria.kode).all()
+def backfill_static_values(jurusan_id):
+    """
+    Salin nilai kriteria static_jurusan (misal C6) ke NilaiSiswa untuk SEMUA siswa
+    satu jurusan dengan satu statement INSERT ... SELECT.
+    Hanya mengisi yang belum ada (nilai yang sudah tersalin tidak ditimpa).
+    Catatan: scoring tidak membutuhkan ini lagi (nilai statis digabung saat hitung),
+    dipakai jika ingin membekukan nilai statis siswa seperti perilaku lama.
+    """
+    sudah_ada = db.session.query(NilaiSiswa.id).filter(
+        NilaiSiswa.siswa_id == User.id,
+        NilaiSiswa.kriteria_id == Kriteria.id
+    ).exists()
+
+    source = db.session.query(
+        User.id,
+        Kriteria.id,
+        func.coalesce(NilaiStaticJurusan.nilai, 3)  # Default 3 (Cukup)
+    ).select_from(User).join(Kriteria, Kriteria.sumber_nilai == SumberNilaiEnum.static_jurusan) \
+        .outerjoin(NilaiStaticJurusan, and_(
+            NilaiStaticJurusan.jurusan_id == User.jurusan_id,
+            NilaiStaticJurusan.kriteria_id == Kriteria.id
+        )) \
+        .filter(User.jurusan_id == jurusan_id, User.role == RoleEnum.siswa, ~sudah_ada)
+
+    stmt = insert(NilaiSiswa.__table__).from_select(['siswa_id', 'kriteria_id', 'nilai_input'], source)
+    return db.session.execute(stmt).rowcount
+
+
+# Cache konfigurasi kriteria yang sudah dikompilasi ke array NumPy.
+# Dibangun ulang hanya jika versi kriteria berubah (lihat routes/kriteria.py).
+_kriteria_cache = {'versi': None, 'config': None}
+
+
+def compile_kriteria(all_kriteria):
+    """
+    Kompilasi target_jalur, jalur_reverse, skala_maks & atribut menjadi array:
+    - relevan (3 x N): kriteria relevan untuk jalur tsb
+    - dibalik (3 x N): nilai harus diinversi untuk jalur tsb
+    - offset (N): skala_maks + 1 (untuk inversi)
+    - sign (N): +1 benefit, -1 cost
+    - statis (N): kriteria bersumber static_jurusan
+    """
     num_kriteria = len(all_kriteria)
-
-    # Ambil Nilai Siswa
-    nilai_records = NilaiSiswa.query.filter_by(siswa_id=user_id).all()
-    raw_data = {}
-    for n in nilai_records:
-        k_obj = Kriteria.query.get(n.kriteria_id)
-        if k_obj:
-            raw_data[k_obj.kode] = n.nilai_input
-
-    # 2. Ambil Bobot
-    bobot_map = get_aggregated_weights()
-
-    # 3. Bentuk Matriks Keputusan (3 Alternatif x N Kriteria)
-    alternatif_names = ['Melanjutkan Studi', 'Bekerja', 'Berwirausaha']
-    # Mapping index baris: 0=Studi, 1=Kerja, 2=Wirausaha
-    matrix = np.zeros((3, num_kriteria))
+    relevan = np.zeros((3, num_kriteria), dtype=bool)
+    dibalik = np.zeros((3, num_kriteria), dtype=bool)
 
     for j, k in enumerate(all_kriteria):
-        val = raw_data.get(k.kode, 1)  # Nilai default 1
-
-        # Baca Config Dinamis dari Database
         targets = (k.target_jalur or '').lower()
         reverses = (k.jalur_reverse or '').lower()
-        max_scale = k.skala_maks  # Misal 100 utk C1, 5 utk C4
-
-        # Fungsi helper untuk menentukan nilai sel matriks
-        def get_val_for_jalur(jalur_name):
-            # 1. Cek apakah kriteria ini relevan untuk jalur ini?
-            if 'all' in targets or jalur_name in targets:
-                # 2. Cek apakah nilainya harus dibalik? (Misal Ekonomi utk Kerja)
-                if jalur_name in reverses:
-                    # Rumus Inversi: (Max + 1) - Val. Contoh skala 5: (6 - 1) = 5
-                    return (max_scale + 1) - val
-                return val
-            return 1  # Nilai default jika tidak relevan (Netral di MOORA Benefit)
-
-        # Isi Matriks
-        matrix[0, j] = get_val_for_jalur('studi')
-        matrix[1, j] = get_val_for_jalur('kerja')
-        matrix[2, j] = get_val_for_jalur('wirausaha')
-
-    # 4. Normalisasi Vektor
-    norm_matrix = np.zeros((3, num_kriteria))
-    for j in range(num_kriteria):
-        denom = math.sqrt(sum(matrix[i, j] ** 2 for i in range(3)))
-        for i in range(3):
-            norm_matrix[i, j] = matrix[i, j] / denom if denom > 0 else 0
-
-    # 5. Optimasi Yi (Benefit - Cost)
-    y_scores = []
-    for i in range(3):
-        yi = 0
-        for j in range(num_kriteria):
-            code = all_kriteria[j].kode
-            weight = bobot_map.get(code, 0)
-
-            if all_kriteria[j].atribut.value == 'benefit':
-                yi += norm_matrix[i, j] * weight
-            else:
-                yi -= norm_matrix[i, j] * weight
-        y_scores.append(yi)
-
-    # 6. Simpan Hasil
-    hasil = HasilRekomendasi.query.filter_by(siswa_id=user_id, periode_id=periode_id).first()
-    if not hasil:
-        hasil = HasilRekomendasi(siswa_id=user_id, periode_id=periode_id)
-        db.session.add(hasil)
-
-    hasil.skor_studi = float(y_scores[0])
-    hasil.skor_kerja = float(y_scores[1])
-    hasil.skor_wirausaha = float(y_scores[2])
-
-    hasil.keputusan_terbaik = alternatif_names[np.argmax(y_scores)]
-
-    # --- PERBAIKAN: AMBIL KELAS DARI RIWAYAT ---
-    riwayat = RiwayatKelas.query.filter_by(siswa_id=user_id, periode_id=periode_id).first()
-
-    if riwayat:
-        hasil.tingkat_kelas = riwayat.tingkat_kelas
+        for i, jalur in enumerate(JALUR_NAMES):
+            relevan[i, j] = 'all' in targets or jalur in targets
+            dibalik[i, j] = jalur in reverses
+
+    return {
+        'ids': [k.id for k in all_kriteria],
+        'kodes': [k.kode for k in all_kriteria],
+        'index': {k.id: j for j, k in enumerate(all_kriteria)},
+        'relevan': relevan,
+        'dibalik': dibalik,
+        'offset': np.array([k.skala_maks + 1 for k in all_kriteria], dtype=float),
+        'sign': np.array([1.0 if k.atribut.value == 'benefit' else -1.0 for k in all_kriteria]),
+        'statis': np.array([k.sumber_nilai.value == 'static_jurusan' for k in all_kriteria], dtype=bool),
+    }
+
+
+def get_compiled_kriteria(versi=None):
+    """Ambil config kriteria terkompilasi, bangun ulang jika versi kriteria berubah"""
+    if versi is None:
+        versi = get_version(VERSI_KRITERIA)
+    if _kriteria_cache['versi'] != versi or _kriteria_cache['config'] is None:
+        all_kriteria = Kriteria.query.order_by(Kriteria.kode).all()
+        _kriteria_cache['config'] = compile_kriteria(all_kriteria)
+        _kriteria_cache['versi'] = versi
+    return _kriteria_cache['config']
+
+
+# Cache tabel nilai statis (jurusan x kriteria). Kunci = (versi statis, versi kriteria),
+# versi statis di-bump setiap NilaiStaticJurusan disimpan.
+_static_cache = {'versi': None, 'table': None, 'jurusan_index': None}
+
+
+def get_static_table(config, versions):
+    """
+    Tabel nilai statis J x N sesuai urutan config kriteria.
+    Baris terakhir adalah default (3) untuk jurusan yang belum punya nilai.
+    """
+    versi = (versions[VERSI_STATIC], versions[VERSI_KRITERIA])
+    if _static_cache['versi'] != versi or _static_cache['table'] is None:
+        rows = db.session.query(NilaiStaticJurusan.jurusan_id, NilaiStaticJurusan.kriteria_id,
+                                NilaiStaticJurusan.nilai).all()
+        jurusan_index = {jur_id: i for i, jur_id in enumerate(sorted({r[0] for r in rows}))}
+        table = np.full((len(jurusan_index) + 1, len(config['ids'])), 3.0)  # Default 3 (Cukup)
+        for jurusan_id, kriteria_id, nilai in rows:
+            j = config['index'].get(kriteria_id)
+            if j is not None:
+                table[jurusan_index[jurusan_id], j] = nilai
+        _static_cache['table'] = table
+        _static_cache['jurusan_index'] = jurusan_index
+        _static_cache['versi'] = versi
+    return _static_cache['table'], _static_cache['jurusan_index']
+
+
+# Cache bobot agregat. Kunci = (versi bobot, versi kriteria), versi bobot
+# di-bump oleh routes/bwm.py::save_bwm.
+_bobot_cache = {'versi': None, 'weights': None}
+
+
+def get_aggregated_weights(versions=None):
+    """Mengambil bobot BWM optimal: konsensus Group BWM, atau rata-rata antar pakar dari tabel BobotKriteria"""
+    if versions is None:
+        versions = get_engine_versions()
+    versi = (versions[VERSI_BOBOT], versions[VERSI_KRITERIA])
+
+    if _bobot_cache['versi'] != versi or _bobot_cache['weights'] is None:
+        # Mode Group BWM: pakai bobot konsensus (jika sudah ada)
+        rows = []
+        if get_bwm_mode() != 'rata_rata':
+            rows = db.session.query(Kriteria.kode, BobotKonsensus.nilai_bobot) \
+                .outerjoin(BobotKonsensus, BobotKonsensus.kriteria_id == Kriteria.id).all()
+            if all(bobot is None for _, bobot in rows):
+                rows = []
+
+        if not rows:
+            # Satu query agregasi: AVG per kriteria atas set bobot yang aktif (rata-rata jika ada lebih dari 1 pakar)
+            join_on = BobotKriteria.kriteria_id == Kriteria.id
+            active_set_ids = get_active_set_ids()
+            if active_set_ids:
+                join_on = and_(join_on, BobotKriteria.set_bobot_id.in_(active_set_ids))
+            rows = db.session.query(Kriteria.kode, func.avg(BobotKriteria.nilai_bobot)) \
+                .outerjoin(BobotKriteria, join_on) \
+                .group_by(Kriteria.id, Kriteria.kode).all()
+        weights = {}
+        for kode, avg_bobot in rows:
+            weights[kode] = float(avg_bobot) if avg_bobot is not None else 1.0 / len(rows)
+        _bobot_cache['weights'] = weights
+        _bobot_cache['versi'] = versi
+    return _bobot_cache['weights']
+
+
+def get_weight_vector(config, versions=None):
+    """Vektor bobot (N) sesuai urutan config kriteria, sudah dikali tanda benefit/cost"""
+    bobot_map = get_aggregated_weights(versions)
+    return np.array([bobot_map.get(kode, 0) for kode in config['kodes']]) * config['sign']
+
+
+def get_engine_versions():
+    """Semua versi yang mempengaruhi skor (satu query)"""
+    return get_versions(VERSI_BOBOT, VERSI_KRITERIA, VERSI_STATIC)
+
+
+def versi_signature(versi_input, versions):
+    """Tanda versi input siswa + bobot + kriteria + nilai statis yang dipakai untuk menghitung hasil"""
+    return f"{versi_input or 0}:{versions[VERSI_BOBOT]}:{versions[VERSI_KRITERIA]}:{versions[VERSI_STATIC]}"
+
+
+def build_norm_tensor(siswa_ids, config, versions):
+    """
+    Bentuk matriks keputusan ternormalisasi untuk banyak siswa: tensor S x 3 x N.
+    siswa_ids harus sudah unik & terurut.
+    Return: (norm_matrix, jurusan_ids) -> jurusan_ids berisi jurusan tiap siswa (None jika kosong)
+    """
+    num_kriteria = len(config['ids'])
+    k_index = config['index']
+    s_index = {sid: i for i, sid in enumerate(siswa_ids)}
+
+    # 1. Ambil Nilai Semua Siswa (Satu Query)
+    # Nilai default 1 jika siswa belum punya nilai untuk kriteria tsb
+    values = np.ones((len(siswa_ids), num_kriteria))
+    has_value = np.zeros((len(siswa_ids), num_kriteria), dtype=bool)
+    nilai_rows = db.session.query(NilaiSiswa.siswa_id, NilaiSiswa.kriteria_id, NilaiSiswa.nilai_input) \
+        .filter(NilaiSiswa.siswa_id.in_(siswa_ids)).all()
+    for siswa_id, kriteria_id, nilai_input in nilai_rows:
+        j = k_index.get(kriteria_id)
+        if j is not None:
+            values[s_index[siswa_id], j] = nilai_input
+            has_value[s_index[siswa_id], j] = True
+
+    jurusan_ids = [None] * len(siswa_ids)
+    for siswa_id, jurusan_id in db.session.query(User.id, User.jurusan_id).filter(User.id.in_(siswa_ids)).all():
+        jurusan_ids[s_index[siswa_id]] = jurusan_id
+
+    # Kriteria statis digabung saat hitung dari tabel jurusan x kriteria (cache),
+    # kecuali siswa sengaja dibekukan dengan salinan di NilaiSiswa (flask backfill-static).
+    # Salinan lama dari ensure_static_values dihapus oleh migrasi b8e3d1f6a274.
+    # Siswa tanpa jurusan tetap memakai nilai default 1.
+    if config['statis'].any():
+        static_table, jurusan_index = get_static_table(config, versions)
+        default_row = len(static_table) - 1
+        jur_idx = np.array([jurusan_index.get(jur_id, default_row) if jur_id else -1 for jur_id in jurusan_ids],
+                           dtype=int)
+
+        pakai_statis = config['statis'] & ~has_value & (jur_idx >= 0)[:, None]
+        values = np.where(pakai_statis, static_table[jur_idx], values)
+
+    # 2. Bentuk Tensor Keputusan (S x 3 x N)
+    # Nilai 1 jika tidak relevan (Netral di MOORA Benefit)
+    # Rumus Inversi: (Max + 1) - Val. Contoh skala 5: (6 - 1) = 5
+    vals = values[:, None, :]
+    matrix = np.where(config['relevan'], np.where(config['dibalik'], config['offset'] - vals, vals), 1.0)
+
+    # 3. Normalisasi Vektor per Siswa (per kolom kriteria)
+    return vector_normalize(matrix), jurusan_ids
+
+
+def calculate_ranking_batch(periode_id, siswa_ids):
+    """
+    Menghitung MOORA untuk banyak siswa sekaligus (satu kohort).
+    Semua nilai diambil dengan satu query, matriks keputusan dibentuk sebagai
+    tensor S x 3 x N, lalu dinormalisasi & dihitung Yi dalam satu langkah NumPy.
+    Hasil ditulis dengan bulk upsert ke HasilRekomendasi (tanpa commit).
+    Return: dict {siswa_id: (y_scores, keputusan)}
+    """
+    siswa_ids = sorted({int(s) for s in siswa_ids})
+    if not siswa_ids:
+        return {}
+
+    # 1-4. Ambil Config Kriteria (cache) & Bentuk Tensor Ternormalisasi
+    versions = get_engine_versions()
+    config = get_compiled_kriteria(versions[VERSI_KRITERIA])
+    norm_matrix, _ = build_norm_tensor(siswa_ids, config, versions)
+
+    # 5. Optimasi Yi (Benefit - Cost) -> (S x 3)
+    weights = get_weight_vector(config, versions)
+    y_scores = ratio_scores(norm_matrix, weights)
+    best_idx = np.argmax(y_scores, axis=1)
+
+    # 6. Simpan Hasil (Bulk Upsert)
+    # Kelas diambil dari Riwayat periode ini
+    riwayat_map = dict(db.session.query(RiwayatKelas.siswa_id, RiwayatKelas.tingkat_kelas).filter(
+        RiwayatKelas.periode_id == periode_id,
+        RiwayatKelas.siswa_id.in_(siswa_ids)
+    ).all())
+
+    # Versi input siswa saat ini (untuk tanda versi hasil)
+    versi_input_map = dict(db.session.query(HasilRekomendasi.siswa_id, HasilRekomendasi.versi_input).filter(
+        HasilRekomendasi.periode_id == periode_id,
+        HasilRekomendasi.siswa_id.in_(siswa_ids)
+    ).all())
+
+    rows = []
+    results = {}
+    for i, siswa_id in enumerate(siswa_ids):
+        keputusan = ALTERNATIF_NAMES[best_idx[i]]
+        versi_input = versi_input_map.get(siswa_id) or 0
+        rows.append({
+            'siswa_id': siswa_id,
+            'periode_id': periode_id,
+            'tingkat_kelas': riwayat_map.get(siswa_id, 'Unknown'),
+            'skor_studi': float(y_scores[i, 0]),
+            'skor_kerja': float(y_scores[i, 1]),
+            'skor_wirausaha': float(y_scores[i, 2]),
+            'keputusan_terbaik': keputusan,
+            'versi_input': versi_input,
+            'versi_hitung': versi_signature(versi_input, versions)
+        })
+        results[siswa_id] = (y_scores[i].tolist(), keputusan)
+
+    # versi_input tidak ditimpa, agar input yang masuk saat proses hitung tetap terdeteksi stale
+    bulk_upsert(HasilRekomendasi, rows, index_elements=['siswa_id', 'periode_id'],
+                update_columns=['tingkat_kelas', 'skor_studi', 'skor_kerja', 'skor_wirausaha',
+                                'keputusan_terbaik', 'versi_hitung'])
+    return results
+
+
+def get_siswa_ids_periode(periode_id):
+    """
+    ID siswa aktif di periode ini yang sudah mengisi kuesioner (sama seperti syarat halaman result):
+    punya nilai input & pernah submit (punya hasil). Draft autosave tanpa submit tidak ikut.
+    """
+    return [row.siswa_id for row in db.session.query(RiwayatKelas.siswa_id).filter(
+        RiwayatKelas.periode_id == periode_id,
+        RiwayatKelas.status_akhir == 'Aktif',
+        RiwayatKelas.siswa_id.in_(
+            db.session.query(NilaiSiswa.siswa_id).join(Kriteria)
+            .filter(Kriteria.sumber_nilai == SumberNilaiEnum.input_siswa)
+        ),
+        RiwayatKelas.siswa_id.in_(db.session.query(HasilRekomendasi.siswa_id))
+    ).all()]
+
+
+# Cache tensor ternormalisasi satu kohort (periode) untuk simulasi what-if bobot.
+# Skor MOORA linear terhadap bobot, jadi tensor ini tetap valid saat bobot berubah.
+# Dibangun ulang penuh jika periode/kriteria/nilai statis berubah, dan per-baris
+# (incremental) untuk siswa yang versi_input-nya berubah (baru menyimpan jawaban).
+_cohort_cache = {'key': None, 'siswa_ids': [], 'versi_input': {}, 'tensor': None, 'jurusan_ids': []}
+
+
+def get_cohort_tensor(periode_id, versions, config):
+    """Return: (siswa_ids, tensor S x 3 x N, jurusan_ids) untuk kohort periode"""
+    key = (periode_id, versions[VERSI_KRITERIA], versions[VERSI_STATIC])
+
+    siswa_ids = sorted(get_siswa_ids_periode(periode_id))
+    versi_input = dict(db.session.query(HasilRekomendasi.siswa_id, HasilRekomendasi.versi_input)
+                       .filter(HasilRekomendasi.periode_id == periode_id).all())
+    versi_input = {sid: versi_input.get(sid, 0) for sid in siswa_ids}
+
+    if _cohort_cache['key'] != key or _cohort_cache['tensor'] is None:
+        # Rebuild penuh
+        tensor, jurusan_ids = build_norm_tensor(siswa_ids, config, versions)
     else:
-        hasil.tingkat_kelas = "Unknown"
-        # -------------------------------------------------------------
+        # Rebuild hanya baris siswa baru / yang inputnya berubah
+        old_index = {sid: i for i, sid in enumerate(_cohort_cache['siswa_ids'])}
+        berubah = [sid for sid in siswa_ids
+                   if sid not in old_index or _cohort_cache['versi_input'].get(sid) != versi_input[sid]]
+
+        tensor = np.empty((len(siswa_ids), 3, len(config['ids'])))
+        jurusan_ids = [None] * len(siswa_ids)
+        tetap = [(i, old_index[sid]) for i, sid in enumerate(siswa_ids) if sid in old_index]
+        if tetap:
+            new_pos, old_pos = map(list, zip(*tetap))
+            tensor[new_pos] = _cohort_cache['tensor'][old_pos]
+            for i, j in tetap:
+                jurusan_ids[i] = _cohort_cache['jurusan_ids'][j]
+
+        if berubah:
+            pos = {sid: i for i, sid in enumerate(siswa_ids)}
+            rows, row_jurusan = build_norm_tensor(berubah, config, versions)
+            target = [pos[sid] for sid in berubah]
+            tensor[target] = rows
+            for i, jur_id in zip(target, row_jurusan):
+                jurusan_ids[i] = jur_id
+
+    _cohort_cache.update({'key': key, 'siswa_ids': siswa_ids, 'versi_input': versi_input,
+                          'tensor': tensor, 'jurusan_ids': jurusan_ids})
+    return siswa_ids, tensor, jurusan_ids
+
+
+def hitung_distribusi(keputusan_idx):
+    """Jumlah siswa per alternatif dari array index keputusan"""
+    counts = np.bincount(keputusan_idx, minlength=3)
+    return {ALTERNATIF_NAMES[i]: int(counts[i]) for i in range(3)}
 
+
+def calculate_ranking(periode_id, user_id):
+    # Pakai engine batch dengan kohort berisi 1 siswa
+    calculate_ranking_batch(periode_id, [user_id])
     db.session.commit()
+
+    hasil = HasilRekomendasi.query.filter_by(siswa_id=user_id, periode_id=periode_id).first()
     return hasil, None
 
 
@@ -153,39 +380,38 @@ def get_result():
 
     # KASUS 2: Default (Buka halaman result)
     else:
-        periode_aktif = Periode.query.filter_by(is_active=True).first()
-
         # --- PERBAIKAN BUG ALUMNI & FRESH STUDENT ---
-        is_active_student = False
-
-        if periode_aktif:
-            # Cek apakah siswa punya riwayat AKTIF di periode ini?
-            riwayat = RiwayatKelas.query.filter_by(
-                siswa_id=current_user_id,
-                periode_id=periode_aktif.id,
-                status_akhir='Aktif'
-            ).first()
-            if riwayat:
-                is_active_student = True
+        # Periode aktif & riwayat AKTIF siswa diambil dari konteks siswa (lihat siswa_context.py)
+        ctx = get_siswa_context()
+        periode_aktif = ctx['periode'] if ctx else None
+        is_active_student = bool(ctx and ctx['is_eligible'])
 
         if is_active_student:
-            # --- CEK APAKAH SUDAH ISI PENILAIAN? (FIX BUG FRESH STUDENT) ---
-            # Kita cek apakah ada data NilaiSiswa dari inputan user (non-static) untuk siswa ini
-            # Join dengan Kriteria untuk memastikan itu data input_siswa
-            has_input = db.session.query(NilaiSiswa).join(Kriteria).filter(
-                NilaiSiswa.siswa_id == current_user_id,
-                Kriteria.sumber_nilai == 'input_siswa'
-            ).first()
-
-            if not has_input:
-                # JIKA BELUM INPUT: Jangan hitung!
-                # Frontend akan menerima 404 dan menampilkan "Data belum tersedia"
-                return jsonify({'msg': 'Belum ada data penilaian. Silakan isi kuesioner terlebih dahulu.'}), 404
-
-            # JIKA SUDAH INPUT: Hitung baru/Update (Agar skor selalu sync dengan bobot terbaru)
             periode_nama = periode_aktif.nama_periode
-            hasil, error = calculate_ranking(periode_aktif.id, current_user_id)
-            if error: return jsonify({'hasil': None, 'msg': error}), 200
+            hasil = HasilRekomendasi.query.filter_by(siswa_id=current_user_id, periode_id=periode_aktif.id).first()
+            versions = get_engine_versions()
+
+            # Hitung ulang HANYA jika input siswa, bobot, atau config kriteria berubah
+            # sejak hasil terakhir dihitung. Jika tidak, hasil tersimpan dipakai (read-only).
+            if not hasil or hasil.versi_hitung != versi_signature(hasil.versi_input, versions):
+                # --- CEK APAKAH SUDAH ISI PENILAIAN? (FIX BUG FRESH STUDENT) ---
+                # Kita cek apakah ada data NilaiSiswa dari inputan user (non-static) untuk siswa ini
+                # Join dengan Kriteria untuk memastikan itu data input_siswa
+                # Draft autosave (PATCH) sebelum submit pertama belum dihitung: wajib pernah submit (punya hasil)
+                has_input = db.session.query(NilaiSiswa).join(Kriteria).filter(
+                    NilaiSiswa.siswa_id == current_user_id,
+                    Kriteria.sumber_nilai == 'input_siswa'
+                ).first()
+                if has_input and not hasil:
+                    has_input = db.session.query(HasilRekomendasi.id).filter_by(siswa_id=current_user_id).first()
+
+                if not has_input:
+                    # JIKA BELUM INPUT: Jangan hitung!
+                    # Frontend akan menerima 404 dan menampilkan "Data belum tersedia"
+                    return jsonify({'msg': 'Belum ada data penilaian. Silakan isi kuesioner terlebih dahulu.'}), 404
+
+                hasil, error = calculate_ranking(periode_aktif.id, current_user_id)
+                if error: return jsonify({'hasil': None, 'msg': error}), 200
 
         else:
             # Jika siswa TIDAK aktif (Alumni/Lulus/Belum didaftarkan) -> AMBIL DATA TERAKHIR
@@ -199,15 +425,13 @@ def get_result():
                 return jsonify({'msg': 'Belum ada data hasil penilaian.'}), 404
         # ---------------------------
 
-    # Cari Alumni Relevan
+    # Cari Alumni Relevan (dari kolom ternormalisasi + cache top-N)
     alumni_list = []
-    user = User.query.get(current_user_id)
-    if user.jurusan and hasil:
-        status_keyword = 'Kuliah' if 'Studi' in hasil.keputusan_terbaik else (
-            'Bekerja' if 'Kerja' in hasil.keputusan_terbaik else 'Wirausaha')
-        alumnis = Alumni.query.filter(Alumni.major.ilike(f"%{user.jurusan.nama_jurusan}%"),
-                                      Alumni.status.ilike(f"%{status_keyword}%")).limit(5).all()
-        alumni_list = [{'name': a.name, 'batch': a.batch, 'status': a.status} for a in alumnis]
+    ctx = get_siswa_context()
+    jurusan_id = ctx['jurusan_id'] if ctx else None
+    if jurusan_id and hasil and hasil.keputusan_terbaik in ALTERNATIF_NAMES:
+        kategori = JALUR_NAMES[ALTERNATIF_NAMES.index(hasil.keputusan_terbaik)]
+        alumni_list = get_alumni_suggestions(jurusan_id, kategori)
 
     return jsonify({
         'hasil': {
@@ -220,4 +444,166 @@ def get_result():
         },
         'alumni': alumni_list,
         'periode': periode_nama
-    })
\ No newline at end of file
+    })
+
+# --- SIMULASI WHAT-IF BOBOT (ADMIN) ---
+
+@moora_bp.route('/what-if', methods=['POST'])
+@jwt_required()
+def what_if_weights():
+    """
+    Simulasi perubahan bobot TANPA menyimpan apapun.
+    Input: {'weights': {'C1': 0.3, ...}, 'periode_id': opsional}
+    Kriteria yang tidak dikirim memakai bobot agregat saat ini.
+    """
+    claims = get_jwt()
+    if claims.get('role') != 'admin':
+        return jsonify({'msg': 'Akses ditolak'}), 403
+
+    data = request.get_json() or {}
+    kandidat = data.get('weights') or {}
+
+    periode_id = data.get('periode_id')
+    if not periode_id:
+        periode_aktif = Periode.query.filter_by(is_active=True).first()
+        if not periode_aktif:
+            return jsonify({'msg': 'Tidak ada periode aktif.'}), 400
+        periode_id = periode_aktif.id
+
+    versions = get_engine_versions()
+    config = get_compiled_kriteria(versions[VERSI_KRITERIA])
+    bobot_sekarang = get_aggregated_weights(versions)
+
+    try:
+        bobot_kandidat = {kode: float(kandidat.get(kode, bobot_sekarang.get(kode, 0))) for kode in config['kodes']}
+    except (TypeError, ValueError):
+        return jsonify({'msg': 'Format bobot tidak valid.'}), 400
+
+    siswa_ids, tensor, jurusan_ids = get_cohort_tensor(periode_id, versions, config)
+    if not siswa_ids:
+        return jsonify({'msg': 'Belum ada siswa yang mengisi di periode ini.'}), 404
+
+    # Satu tensor-vektor product untuk bobot sekarang & kandidat sekaligus (S x 2 x 3)
+    w_matrix = np.stack([
+        get_weight_vector(config, versions),
+        np.array([bobot_kandidat[kode] for kode in config['kodes']]) * config['sign']
+    ])
+    scores = ratio_scores(tensor[:, None], w_matrix)
+    keputusan_sekarang = np.argmax(scores[:, 0], axis=1)
+    keputusan_kandidat = np.argmax(scores[:, 1], axis=1)
+    berubah = keputusan_sekarang != keputusan_kandidat
+
+    # Breakdown per jurusan
+    jurusan_names = dict(db.session.query(Jurusan.id, Jurusan.nama_jurusan).all())
+    jurusan_keys = sorted({j for j in jurusan_ids if j}) + [None]
+    key_pos = {jurusan_id: pos for pos, jurusan_id in enumerate(jurusan_keys)}
+    jur_pos = np.array([key_pos[j] if j else key_pos[None] for j in jurusan_ids])
+
+    per_jurusan = []
+    for pos, jurusan_id in enumerate(jurusan_keys):
+        mask = jur_pos == pos
+        if not mask.any():
+            continue
+        per_jurusan.append({
+            'jurusan_id': jurusan_id,
+            'nama_jurusan': jurusan_names.get(jurusan_id, '-'),
+            'total': int(mask.sum()),
+            'sekarang': hitung_distribusi(keputusan_sekarang[mask]),
+            'kandidat': hitung_distribusi(keputusan_kandidat[mask]),
+            'berubah': int(berubah[mask].sum())
+        })
+
+    return jsonify({
+        'periode_id': periode_id,
+        'total_siswa': len(siswa_ids),
+        'bobot_sekarang': {kode: bobot_sekarang.get(kode, 0) for kode in config['kodes']},
+        'bobot_kandidat': bobot_kandidat,
+        'distribusi': {
+            'sekarang': hitung_distribusi(keputusan_sekarang),
+            'kandidat': hitung_distribusi(keputusan_kandidat)
+        },
+        'jumlah_berubah': int(berubah.sum()),
+        'per_jurusan': per_jurusan
+    })
+
+
+# --- ANALISIS SENSITIVITAS BOBOT (MONTE CARLO) ---
+
+SENSITIVITY_DEFAULT_SAMPLES = 10000
+SENSITIVITY_MAX_SAMPLES = 50000
+
+
+@moora_bp.route('/sensitivity/<int:siswa_id>', methods=['POST'])
+@jwt_required()
+def sensitivity(siswa_id):
+    """
+    Seberapa stabil rekomendasi siswa jika bobot BWM sedikit bergeser.
+    Bobot sampel diambil dari distribusi Dirichlet di sekitar bobot saat ini,
+    lalu semua sampel dihitung sekaligus: K x (3 x N) @ (N x 1).
+    Input (opsional): {'samples': 10000, 'concentration': 100, 'seed': 42}
+    concentration besar = sampel makin dekat ke bobot saat ini.
+    """
+    claims = get_jwt()
+    if claims.get('role') not in ['admin', 'pakar'] and str(get_jwt_identity()) != str(siswa_id):
+        return jsonify({'msg': 'Akses ditolak'}), 403
+
+    data = request.get_json(silent=True) or {}
+    try:
+        samples = min(int(data.get('samples', SENSITIVITY_DEFAULT_SAMPLES)), SENSITIVITY_MAX_SAMPLES)
+        concentration = float(data.get('concentration', 100))
+        seed = data.get('seed')
+        seed = int(seed) if seed is not None else None
+    except (TypeError, ValueError):
+        return jsonify({'msg': 'Parameter tidak valid.'}), 400
+    if samples < 1 or concentration <= 0:
+        return jsonify({'msg': 'samples dan concentration harus positif.'}), 400
+
+    if not User.query.get(siswa_id):
+        return jsonify({'msg': 'Siswa tidak ditemukan'}), 404
+
+    versions = get_engine_versions()
+    config = get_compiled_kriteria(versions[VERSI_KRITERIA])
+    norm_matrix = build_norm_tensor([siswa_id], config, versions)[0][0]  # 3 x N
+
+    bobot_map = get_aggregated_weights(versions)
+    base = np.array([bobot_map.get(kode, 0) for kode in config['kodes']], dtype=float)
+    total_bobot = base.sum()
+    if total_bobot <= 0:
+        return jsonify({'msg': 'Bobot kriteria belum tersedia.'}), 400
+
+    # Sampel bobot Dirichlet (K x N), skala disamakan dengan total bobot saat ini
+    rng = np.random.default_rng(seed)
+    alpha = np.maximum(base / total_bobot * concentration, 1e-3)
+    sampled = rng.dirichlet(alpha, size=samples) * total_bobot
+
+    # Skor semua sampel sekaligus (K x 3) lalu hitung pemenang tiap sampel
+    scores = ratio_scores(norm_matrix, sampled, config['sign'])
+    winners = np.argmax(scores, axis=1)
+    win_counts = np.bincount(winners, minlength=3)
+
+    base_scores = ratio_scores(norm_matrix, base, config['sign'])
+    percentiles = np.percentile(scores, [5, 50, 95], axis=0)  # 3 (persentil) x 3 (alternatif)
+
+    alternatif = []
+    for i, name in enumerate(ALTERNATIF_NAMES):
+        p = win_counts[i] / samples
+        margin = 1.96 * np.sqrt(p * (1 - p) / samples)
+        alternatif.append({
+            'name': name,
+            'skor_saat_ini': float(base_scores[i]),
+            'win_rate': float(p),
+            'win_rate_ci95': [float(max(p - margin, 0)), float(min(p + margin, 1))],
+            'skor_p5': float(percentiles[0, i]),
+            'skor_p50': float(percentiles[1, i]),
+            'skor_p95': float(percentiles[2, i])
+        })
+
+    keputusan_idx = int(np.argmax(base_scores))
+    return jsonify({
+        'siswa_id': siswa_id,
+        'samples': samples,
+        'concentration': concentration,
+        'keputusan_saat_ini': ALTERNATIF_NAMES[keputusan_idx],
+        'stabilitas': float(win_counts[keputusan_idx] / samples),
+        'alternatif': alternatif
+    })
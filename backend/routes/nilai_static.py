@@ -1,6 +1,8 @@
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt
 from models import db, NilaiStaticJurusan, Jurusan, Kriteria, RoleEnum
+from helpers import bump_version, VERSI_STATIC
+from worker import enqueue_recalc
 
 nilai_static_bp = Blueprint('nilai_static', __name__)
 
@@ -59,8 +61,11 @@ def save_nilai_static():
 
                 obj.nilai = float(nilai_val)
 
+        # Invalidate cache tabel nilai statis (engine MOORA) & jadwalkan hitung ulang hasil siswa
+        bump_version(VERSI_STATIC)
+        job = enqueue_recalc('nilai_static')
         db.session.commit()
-        return jsonify({'msg': 'Nilai statis jurusan berhasil disimpan!'}), 200
+        return jsonify({'msg': 'Nilai statis jurusan berhasil disimpan!', 'job_id': job.id if job else None}), 200
     except Exception as e:
         db.session.rollback()
         return jsonify({'msg': f'Error: {str(e)}'}), 500
\ No newline at end of file
@@ -2,6 +2,7 @@ from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt
 from models import db, Periode, RiwayatKelas, User, RoleEnum
 from sqlalchemy import desc
+from helpers import bump_version, VERSI_PERIODE
 
 periode_bp = Blueprint('periode', __name__)
 
@@ -56,6 +57,8 @@ def update(id):
 
     data = request.get_json()
     p.nama_periode = data.get('nama_periode', p.nama_periode)
+    if p.is_active:
+        bump_version(VERSI_PERIODE)  # Nama periode aktif ikut di-cache
     db.session.commit()
     return jsonify({'msg': 'Periode diperbarui'}), 200
 
@@ -134,6 +137,7 @@ def activate(id):
 
         # 2. Aktifkan Periode Baru
         target_periode.is_active = True
+        bump_version(VERSI_PERIODE)  # Invalidate cache periode aktif di semua worker
         db.session.commit()
 
         return jsonify({'msg': msg}), 200
@@ -1,131 +1,83 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, json, Response, stream_with_context
 from flask_jwt_extended import jwt_required
 import numpy as np
-from scipy.optimize import linprog
+from spk_engine import moora, rank_order, rank_positions, type_signs
+from spk_engine.bwm import consistency_ratio
+from solver_pool import solve_bwm_pooled, solve_bwm_many, solver_error_response, SolverError
 
 simulation_bp = Blueprint('simulation', __name__)
 
+# Tipe data matriks yang boleh diminta klien (default float64)
+SIM_DTYPES = {'float32': np.float32, 'float64': np.float64}
+
+# Batas jumlah skenario per request /integrated/batch
+SIM_BATCH_MAX = 1000
+
+# Streaming NDJSON (Accept: application/x-ndjson): satu baris JSON per skenario / alternatif
+NDJSON_MIMETYPE = 'application/x-ndjson'
+SIM_STREAM_CHUNK = 50  # Skenario batch yang dihitung per langkah streaming
+
 
 # --- CORE LOGIC (HELPER FUNCTIONS) ---
 
-def calculate_bwm_logic(criteria, best_idx, worst_idx, ab_values, aw_values):
-    n = len(criteria)
-    # Variabel keputusan: [w1, w2, ..., wn, xi]
-    c = np.zeros(n + 1)
-    c[-1] = 1  # Minimalkan xi
-
-    A_ub = []
-    b_ub = []
-
-    # Constraint 1: |w_B - a_Bj * w_j| <= xi
-    for j in range(n):
-        if j == best_idx: continue
-        # w_B - a_Bj * w_j - xi <= 0
-        row1 = np.zeros(n + 1);
-        row1[best_idx] = 1;
-        row1[j] = -ab_values[j];
-        row1[-1] = -1
-        A_ub.append(row1);
-        b_ub.append(0)
-        # -w_B + a_Bj * w_j - xi <= 0
-        row2 = np.zeros(n + 1);
-        row2[best_idx] = -1;
-        row2[j] = ab_values[j];
-        row2[-1] = -1
-        A_ub.append(row2);
-        b_ub.append(0)
-
-    # Constraint 2: |w_j - a_jW * w_W| <= xi
-    for j in range(n):
-        if j == worst_idx: continue
-        # w_j - a_jW * w_W - xi <= 0
-        row1 = np.zeros(n + 1);
-        row1[j] = 1;
-        row1[worst_idx] = -aw_values[j];
-        row1[-1] = -1
-        A_ub.append(row1);
-        b_ub.append(0)
-        # -w_j + a_jW * w_W - xi <= 0
-        row2 = np.zeros(n + 1);
-        row2[j] = -1;
-        row2[worst_idx] = aw_values[j];
-        row2[-1] = -1
-        A_ub.append(row2);
-        b_ub.append(0)
-
-    # Constraint 3: Sum(w) = 1
-    A_eq = [np.ones(n + 1)];
-    A_eq[0][-1] = 0;
-    b_eq = [1]
-
-    # Bounds: w >= 0, xi >= 0
-    bounds = [(0, None) for _ in range(n + 1)]
-
-    # SOLVE
-    res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
-
-    if res.success:
-        weights = res.x[:-1]
-        xi = res.x[-1]
-
-        # Hitung Consistency Ratio (CR)
-        ci_table = {1: 0.00, 2: 0.44, 3: 1.00, 4: 1.63, 5: 2.30, 6: 3.00, 7: 3.73, 8: 4.47, 9: 5.23}
-        max_scale = max(np.max(ab_values), np.max(aw_values))
-        ci = ci_table.get(int(max_scale), 5.23)
-        cr = xi / ci if ci > 0 else 0
-
-        return {
-            'success': True,
-            'weights_dict': {criteria[i]: round(weights[i], 4) for i in range(n)},
-            'weights_list': weights.tolist(),
-            'xi': round(xi, 5),
-            'cr': round(cr, 4)
-        }
-    else:
+def format_bwm_result(criteria, ab_values, aw_values, solution):
+    """Bentuk output BWM simulasi dari hasil solver (weights, xi) atau None"""
+    if solution is None:
         return {'success': False}
 
+    n = len(criteria)
+    weights, xi = solution
+
+    # Hitung Consistency Ratio (CR)
+    max_scale = max(np.max(ab_values), np.max(aw_values))
+    cr = consistency_ratio(xi, max_scale)
 
-def calculate_moora_logic(alternatives, criteria, matrix, weights, types):
-    rows, cols = matrix.shape
-    norm_matrix = np.zeros((rows, cols))
-    divisors = []
-
-    # 1. Normalisasi
-    for j in range(cols):
-        sum_sq = np.sum(matrix[:, j] ** 2)
-        divisor = np.sqrt(sum_sq)
-        divisors.append(round(divisor, 4))
-        if divisor > 0:
-            norm_matrix[:, j] = matrix[:, j] / divisor
+    return {
+        'success': True,
+        'weights_dict': {criteria[i]: round(weights[i], 4) for i in range(n)},
+        'weights_list': weights.tolist(),
+        'xi': round(xi, 5),
+        'cr': round(cr, 4)
+    }
+
+
+def calculate_bwm_logic(criteria, best_idx, worst_idx, ab_values, aw_values):
+    # SOLVE di process pool solver (LP sparse, atau analitik jika konsisten penuh)
+    solution = solve_bwm_pooled(ab_values, aw_values, best_idx, worst_idx)
+    return format_bwm_result(criteria, ab_values, aw_values, solution)
+
+
+def moora_step_detail(norm_row, weights, types):
+    """Detail langkah hitung Yi satu alternatif (string benefit/cost per kriteria)"""
+    step_detail = {'benefit_parts': [], 'cost_parts': []}
+
+    for j in range(len(types)):
+        part_str = f"({round(norm_row[j], 3)} * {round(weights[j], 3)})"
+
+        if types[j] == 'benefit':
+            step_detail['benefit_parts'].append(part_str)
         else:
-            norm_matrix[:, j] = 0
+            step_detail['cost_parts'].append(part_str)
 
-    # 2. Optimasi (Menghitung Yi)
-    y_scores = []
-    calculation_steps = []
+    return step_detail
 
-    for i in range(rows):
-        benefit_sum = 0
-        cost_sum = 0
-        step_detail = {'benefit_parts': [], 'cost_parts': []}
 
-        for j in range(cols):
-            val = norm_matrix[i, j] * weights[j]
-            part_str = f"({round(norm_matrix[i, j], 3)} * {round(weights[j], 3)})"
+def calculate_moora_logic(alternatives, criteria, matrix, weights, types):
+    # 1. Normalisasi & 2. Optimasi (Menghitung Yi) -> engine ter-vektorisasi
+    result = moora(matrix, weights, types=types)
+    return format_moora_detail(alternatives, result['norm'], result['divisors'], result['scores'], weights, types)
 
-            if types[j] == 'benefit':
-                benefit_sum += val
-                step_detail['benefit_parts'].append(part_str)
-            else:
-                cost_sum += val
-                step_detail['cost_parts'].append(part_str)
 
-        yi = benefit_sum - cost_sum
-        y_scores.append(round(yi, 4))
-        calculation_steps.append(step_detail)
+def format_moora_detail(alternatives, norm_matrix, divisors, scores, weights, types):
+    """Output MOORA detail (divisor, matriks normalisasi, ranking + langkah) dari hasil engine satu matriks"""
+    divisors = [round(float(d), 4) for d in divisors]
+    y_scores = [round(float(y), 4) for y in scores]
+
+    # Detail langkah hitung (untuk tampilan pembelajaran)
+    calculation_steps = [moora_step_detail(norm_matrix[i], weights, types) for i in range(len(norm_matrix))]
 
     # 3. Perankingan
-    ranked_indices = np.argsort(y_scores)[::-1]  # Descending sort
+    ranked_indices = rank_order(np.array(y_scores))  # Descending sort
     final_ranking = []
     for rank, idx in enumerate(ranked_indices, 1):
         final_ranking.append({
@@ -142,17 +94,127 @@ def calculate_moora_logic(alternatives, criteria, matrix, weights, types):
     }
 
 
+def calculate_moora_scores(matrix, weights, types):
+    """Mode ringkas (mode=scores): hanya skor & peringkat, tanpa detail langkah / matriks normalisasi"""
+    result = moora(matrix, weights, types=types)
+    return {
+        'scores': result['scores'].tolist(),
+        'ranks': rank_positions(result['order']).tolist()
+    }
+
+
+def iter_moora_lines(alternatives, matrix, weights, types):
+    """Versi streaming calculate_moora_logic: baris pembagi, lalu satu baris per alternatif sesuai peringkat"""
+    result = moora(matrix, weights, types=types)
+    norm_matrix = result['norm']
+    y_scores = [round(float(y), 4) for y in result['scores']]
+
+    yield {'type': 'divisors', 'divisors': [round(float(d), 4) for d in result['divisors']]}
+
+    for rank, idx in enumerate(rank_order(np.array(y_scores)), 1):
+        yield {
+            'type': 'alternatif',
+            'rank': rank,
+            'name': alternatives[idx],
+            'score': y_scores[idx],
+            'norm': norm_matrix[idx].tolist(),
+            'detail': moora_step_detail(norm_matrix[idx], weights, types)
+        }
+
+
+def iter_moora_score_lines(matrix, weights, types):
+    """Versi streaming mode=scores: satu baris per alternatif sesuai urutan input"""
+    result = moora(matrix, weights, types=types)
+    ranks = rank_positions(result['order'])
+    for i, (score, rank) in enumerate(zip(result['scores'].tolist(), ranks.tolist())):
+        yield {'index': i, 'score': score, 'rank': rank}
+
+
+def wants_ndjson():
+    """Klien meminta NDJSON lebih diutamakan daripada JSON biasa (Accept: application/x-ndjson)"""
+    accept = request.accept_mimetypes
+    return accept[NDJSON_MIMETYPE] > accept['application/json']
+
+
+def ndjson_response(lines):
+    """Stream satu objek JSON per baris langsung dari generator (memori tidak ikut membesar)"""
+    return Response(stream_with_context(json.dumps(line) + '\n' for line in lines), mimetype=NDJSON_MIMETYPE)
+
+
+def get_sim_dtype(data):
+    return SIM_DTYPES.get(data.get('dtype'), np.float64)
+
+
+def calculate_integrated_batch(scenarios, mode='detail', dtype=np.float64):
+    """
+    Banyak skenario BWM -> MOORA sekaligus, hasil sesuai urutan input.
+    1. Semua BWM di-solve paralel di process pool solver
+    2. Matriks MOORA dengan bentuk (M x N) sama ditumpuk dan dihitung dalam satu batch NumPy,
+       detail per skenario (mode detail) diiris dari hasil batch
+    """
+    bwm_inputs = [(np.array(sc['ab_values']), np.array(sc['aw_values'])) for sc in scenarios]
+    solutions = solve_bwm_many([(ab, aw, sc['best_idx'], sc['worst_idx'])
+                                for sc, (ab, aw) in zip(scenarios, bwm_inputs)])
+
+    results = [None] * len(scenarios)
+    groups = {}
+    for i, (sc, (ab, aw), solution) in enumerate(zip(scenarios, bwm_inputs, solutions)):
+        bwm_res = format_bwm_result(sc['criteria'], ab, aw, solution)
+        if not bwm_res['success']:
+            results[i] = {'bwm_result': bwm_res, 'msg': 'BWM Infeasible (Cek Konsistensi Input)'}
+            continue
+
+        matrix = np.asarray(sc['matrix'], dtype=dtype)
+        groups.setdefault(matrix.shape, []).append((i, matrix, bwm_res, sc))
+
+    # Satu perhitungan MOORA per kelompok bentuk matriks (K x M x N)
+    for items in groups.values():
+        indices, matrices, bwm_list, sc_list = zip(*items)
+        weights = np.array([bwm_res['weights_list'] for bwm_res in bwm_list], dtype=dtype)
+        signs = np.array([type_signs(sc['types']) for sc in sc_list], dtype=dtype)
+
+        result = moora(np.stack(matrices), weights, signs=signs)
+        ranks = rank_positions(result['order']) if mode == 'scores' else None
+        for k, i in enumerate(indices):
+            if mode == 'scores':
+                moora_res = {'scores': result['scores'][k].tolist(), 'ranks': ranks[k].tolist()}
+            else:
+                moora_res = format_moora_detail(sc_list[k]['alternatives'], result['norm'][k],
+                                                result['divisors'][k], result['scores'][k],
+                                                weights[k], sc_list[k]['types'])
+            results[i] = {'bwm_result': bwm_list[k], 'moora_result': moora_res}
+
+    return results
+
+
+def iter_integrated_batch(scenarios, mode='detail', dtype=np.float64):
+    """Versi streaming calculate_integrated_batch: dihitung per SIM_STREAM_CHUNK skenario, satu baris per skenario"""
+    for start in range(0, len(scenarios), SIM_STREAM_CHUNK):
+        try:
+            results = calculate_integrated_batch(scenarios[start:start + SIM_STREAM_CHUNK], mode, dtype)
+        except SolverError as e:
+            yield {'index': start, 'msg': str(e)}
+            return
+
+        for offset, result in enumerate(results):
+            yield {'index': start + offset, **result}
+
+
 # --- ROUTES ---
 
 @simulation_bp.route('/bwm', methods=['POST'])
 @jwt_required()
 def simulate_bwm():
     data = request.get_json()
-    res = calculate_bwm_logic(
-        data['criteria'], data['best_idx'], data['worst_idx'],
-        np.array(data['ab_values']), np.array(data['aw_values'])
-    )
-    if res['success']: return jsonify(res)
+    try:
+        res = calculate_bwm_logic(
+            data['criteria'], data['best_idx'], data['worst_idx'],
+            np.array(data['ab_values']), np.array(data['aw_values'])
+        )
+    except SolverError as e:
+        return solver_error_response(e)
+    if res['success']:
+        return ndjson_response([res]) if wants_ndjson() else jsonify(res)
     return jsonify({'msg': 'Perhitungan Gagal'}), 400
 
 
@@ -160,6 +222,20 @@ def simulate_bwm():
 @jwt_required()
 def simulate_moora():
     data = request.get_json()
+
+    # Mode ringkas untuk matriks besar: ?mode=scores (atau "mode" di body), opsional "dtype": "float32"
+    if data.get('mode', request.args.get('mode')) == 'scores':
+        dtype = get_sim_dtype(data)
+        args = (np.asarray(data['matrix'], dtype=dtype), np.asarray(data['weights'], dtype=dtype), data['types'])
+        if wants_ndjson():
+            return ndjson_response(iter_moora_score_lines(*args))
+        return jsonify(calculate_moora_scores(*args))
+
+    if wants_ndjson():
+        return ndjson_response(iter_moora_lines(
+            data['alternatives'], np.array(data['matrix']), np.array(data['weights']), data['types']
+        ))
+
     res = calculate_moora_logic(
         data['alternatives'], data['criteria'],
         np.array(data['matrix']), np.array(data['weights']), data['types']
@@ -177,10 +253,13 @@ def simulate_integrated():
     data = request.get_json()
 
     # 1. JALANKAN BWM
-    bwm_res = calculate_bwm_logic(
-        data['criteria'], data['best_idx'], data['worst_idx'],
-        np.array(data['ab_values']), np.array(data['aw_values'])
-    )
+    try:
+        bwm_res = calculate_bwm_logic(
+            data['criteria'], data['best_idx'], data['worst_idx'],
+            np.array(data['ab_values']), np.array(data['aw_values'])
+        )
+    except SolverError as e:
+        return solver_error_response(e)
 
     if not bwm_res['success']:
         return jsonify({'msg': 'BWM Infeasible (Cek Konsistensi Input)'}), 400
@@ -189,6 +268,14 @@ def simulate_integrated():
     weights_from_bwm = bwm_res['weights_list']
 
     # 2. JALANKAN MOORA (Pakai bobot dari BWM)
+    if wants_ndjson():
+        def lines():
+            yield {'type': 'bwm', **bwm_res}
+            yield from iter_moora_lines(
+                data['alternatives'], np.array(data['matrix']), np.array(weights_from_bwm), data['types']
+            )
+        return ndjson_response(lines())
+
     moora_res = calculate_moora_logic(
         data['alternatives'], data['criteria'],
         np.array(data['matrix']), np.array(weights_from_bwm), data['types']
@@ -197,4 +284,34 @@ def simulate_integrated():
     return jsonify({
         'bwm_result': bwm_res,
         'moora_result': moora_res
-    })
\ No newline at end of file
+    })
+
+
+@simulation_bp.route('/integrated/batch', methods=['POST'])
+@jwt_required()
+def simulate_integrated_batch():
+    """
+    Banyak skenario integrated (BWM -> MOORA) dalam satu request.
+    Body: {"scenarios": [<body /integrated>, ...], "mode": "scores" (opsional), "dtype": "float32" (opsional)}
+    """
+    data = request.get_json()
+    scenarios = data.get('scenarios') or []
+
+    if not scenarios:
+        return jsonify({'msg': 'Skenario tidak boleh kosong.'}), 400
+    if len(scenarios) > SIM_BATCH_MAX:
+        return jsonify({'msg': f'Maksimal {SIM_BATCH_MAX} skenario per request.'}), 400
+
+    mode = data.get('mode', request.args.get('mode', 'detail'))
+    dtype = get_sim_dtype(data)
+
+    # Streaming: satu baris per skenario begitu chunk-nya selesai dihitung
+    if wants_ndjson():
+        return ndjson_response(iter_integrated_batch(scenarios, mode, dtype))
+
+    try:
+        results = calculate_integrated_batch(scenarios, mode=mode, dtype=dtype)
+    except SolverError as e:
+        return solver_error_response(e)
+
+    return jsonify({'results': results})
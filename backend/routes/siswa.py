@@ -1,59 +1,51 @@
-from flask import Blueprint, request, jsonify
+from flask import Blueprint, request, jsonify, current_app, Response
 from flask_jwt_extended import jwt_required, get_jwt_identity, get_jwt
-from models import db, Kriteria, NilaiSiswa, User, Jurusan, Pertanyaan, HasilRekomendasi, Periode, RiwayatKelas
+from models import db, Kriteria, NilaiSiswa, JawabanSiswa, Pertanyaan, HasilRekomendasi
+from sqlalchemy import func
+from helpers import bulk_upsert, get_version, VERSI_KRITERIA
+from config import Config
+from siswa_context import get_siswa_context, load_siswa_context
+import hashlib
 import json
 
 siswa_bp = Blueprint('siswa', __name__)
+siswa_bp.before_request(load_siswa_context)
 
+# Cache peta pertanyaan -> kriteria (pertanyaan hanya berubah lewat routes/kriteria yang menaikkan VERSI_KRITERIA)
+_pertanyaan_cache = {'versi': None, 'map': {}}
 
-# --- GET FORM DATA (Kriteria & Existing Values) ---
-@siswa_bp.route('/form', methods=['GET'], strict_slashes=False)
-@jwt_required()
-def get_form():
-    current_user_id = get_jwt_identity()
 
-    # --- CEK ELIGIBILITY (BARU) ---
-    periode_aktif = Periode.query.filter_by(is_active=True).first()
-    is_eligible = False
-    status_message = ""
+def get_pertanyaan_map():
+    """{pertanyaan_id: (kriteria_id, kriteria_kode, kriteria_nama, teks)} dari cache (satu query cek versi)"""
+    versi = get_version(VERSI_KRITERIA)
+    if _pertanyaan_cache['versi'] != versi:
+        rows = db.session.query(Pertanyaan.id, Pertanyaan.kriteria_id, Kriteria.kode, Kriteria.nama, Pertanyaan.teks) \
+            .join(Kriteria, Kriteria.id == Pertanyaan.kriteria_id).all()
+        _pertanyaan_cache['map'] = {p_id: (k_id, kode, nama, teks) for p_id, k_id, kode, nama, teks in rows}
+        _pertanyaan_cache['versi'] = versi
+    return _pertanyaan_cache['map']
 
-    if periode_aktif:
-        riwayat = RiwayatKelas.query.filter_by(
-            siswa_id=current_user_id,
-            periode_id=periode_aktif.id,
-            status_akhir='Aktif'
-        ).first()
-
-        if riwayat:
-            is_eligible = True
-        else:
-            status_message = "Anda tidak terdaftar aktif di periode ini (Mungkin sudah Lulus)."
-    else:
-        status_message = "Sistem sedang tidak menerima penilaian (Periode Non-Aktif)."
 
-    # Jika tidak eligible, langsung return (Hemat resource)
-    if not is_eligible:
-        return jsonify({
-            'is_eligible': False,
-            'message': status_message,
-            'data': []
-        })
+# Cache daftar kriteria + pertanyaan form kuesioner (bytes JSON) per VERSI_KRITERIA, sama untuk semua siswa
+_form_cache = {'versi': None, 'body': None}
 
-    # Ambil kriteria yang aktif & tampil di siswa
+
+def build_form_data():
+    """Daftar kriteria input siswa + pertanyaan aktif (dua query, tanpa lazy load per kriteria)"""
     kriterias = Kriteria.query.filter_by(
         sumber_nilai='input_siswa',
         tampil_di_siswa=True
     ).order_by(Kriteria.kode.asc()).all()
 
-    # Ambil nilai lama jika ada (untuk edit)
-    nilai_lama = NilaiSiswa.query.filter_by(siswa_id=current_user_id).all()
-    # Note: Logic ambil nilai lama mungkin perlu disesuaikan jika ingin per-pertanyaan,
-    # tapi untuk sekarang kita biarkan kosong atau load logic agregat jika perlu.
-    # Namun, karena frontend values sekarang berbasis ID Pertanyaan,
-    # idealnya kita load history jawaban per pertanyaan (jika fitur save draft ada).
-    # Untuk simpelnya, kita return form kosong/default dulu atau nilai agregat.
+    pertanyaan_per_kriteria = {}
+    if kriterias:
+        rows = db.session.query(Pertanyaan.id, Pertanyaan.kriteria_id, Pertanyaan.teks).filter(
+            Pertanyaan.kriteria_id.in_([k.id for k in kriterias]),
+            Pertanyaan.is_active == True
+        ).order_by(Pertanyaan.id.asc()).all()
+        for p_id, k_id, teks in rows:
+            pertanyaan_per_kriteria.setdefault(k_id, []).append({'id': p_id, 'teks': teks})
 
-    # Kita siapkan data kriteria
     data = []
     for k in kriterias:
         # Parsing JSON opsi_pilihan jika berupa string (safety check)
@@ -64,22 +56,11 @@ def get_form():
             except:
                 opsi = []
 
-        # Ambil daftar pertanyaan aktif
-        list_pertanyaan = []
-        if hasattr(k, 'list_pertanyaan'):
-            for p in k.list_pertanyaan:
-                if p.is_active:
-                    list_pertanyaan.append({
-                        'id': p.id,
-                        'teks': p.teks
-                    })
-
         data.append({
             'id': k.id,
             'kode': k.kode,
             'nama': k.nama,
-            # 'pertanyaan': k.pertanyaan,  <-- HAPUS INI (Penyebab Error)
-            'list_pertanyaan': list_pertanyaan,  # <-- GANTI DENGAN INI
+            'list_pertanyaan': pertanyaan_per_kriteria.get(k.id, []),
             'tipe_input': k.tipe_input.value if hasattr(k.tipe_input, 'value') else str(k.tipe_input),
             'atribut': k.atribut.value if hasattr(k.atribut, 'value') else str(k.atribut),
             'kategori': k.kategori.value if hasattr(k.kategori, 'value') else str(k.kategori),
@@ -87,8 +68,127 @@ def get_form():
             'skala_maks': k.skala_maks,
             'value': None  # Placeholder
         })
+    return data
+
+
+def get_form_body():
+    """Return: (versi, bytes JSON list data) form kuesioner dari cache (satu query cek versi)"""
+    versi = get_version(VERSI_KRITERIA)
+    if _form_cache['versi'] != versi:
+        _form_cache['body'] = current_app.json.dumps(build_form_data()).encode('utf-8')
+        _form_cache['versi'] = versi
+    return versi, _form_cache['body']
+
+
+def apply_answers(siswa_id, answers, replace=False):
+    """
+    Simpan jawaban per pertanyaan {pertanyaan_id: nilai} (None = hapus jawaban), lalu hitung ulang
+    rata-rata NilaiSiswa kriteria yang tersentuh dari jawaban tersimpan (tanpa commit).
+    replace=True (submit penuh): jawaban tersimpan yang tidak ikut dikirim dihapus.
+    Pertanyaan yang tidak dikenal diabaikan.
+    Return: {kriteria_id: rata-rata baru} (None jika kriteria tidak punya jawaban lagi)
+    """
+    pertanyaan_map = get_pertanyaan_map()
+    answers = {p_id: nilai for p_id, nilai in answers.items() if p_id in pertanyaan_map}
+    if replace:
+        tersimpan = db.session.query(JawabanSiswa.pertanyaan_id).filter(JawabanSiswa.siswa_id == siswa_id).all()
+        for (p_id,) in tersimpan:
+            if p_id not in answers and p_id in pertanyaan_map:
+                answers[p_id] = None
+    if not answers:
+        return {}
+
+    jawaban_rows = [{'siswa_id': siswa_id, 'pertanyaan_id': p_id, 'nilai': nilai}
+                    for p_id, nilai in answers.items() if nilai is not None]
+    dihapus = [p_id for p_id, nilai in answers.items() if nilai is None]
+
+    bulk_upsert(JawabanSiswa, jawaban_rows, ['siswa_id', 'pertanyaan_id'], ['nilai'])
+    if dihapus:
+        JawabanSiswa.query.filter(JawabanSiswa.siswa_id == siswa_id, JawabanSiswa.pertanyaan_id.in_(dihapus)) \
+            .delete(synchronize_session=False)
+
+    # Rata-rata dihitung database dari seluruh jawaban kriteria (bukan selisih di Python) agar autosave
+    # bersamaan tidak saling menimpa. Locking read: membaca jawaban commit terbaru, bukan snapshot transaksi.
+    kriteria_ids = sorted({pertanyaan_map[p_id][0] for p_id in answers})
+    rata = {k_id: (float(avg), int(jumlah)) for k_id, avg, jumlah in db.session.query(
+        Pertanyaan.kriteria_id, func.avg(JawabanSiswa.nilai), func.count(JawabanSiswa.id)
+    ).join(Pertanyaan, Pertanyaan.id == JawabanSiswa.pertanyaan_id).filter(
+        JawabanSiswa.siswa_id == siswa_id,
+        Pertanyaan.kriteria_id.in_(kriteria_ids)
+    ).group_by(Pertanyaan.kriteria_id).with_for_update(read=True).all()}
+
+    bulk_upsert(NilaiSiswa, [{'siswa_id': siswa_id, 'kriteria_id': k_id, 'nilai_input': avg, 'jumlah_jawaban': jumlah}
+                             for k_id, (avg, jumlah) in rata.items()],
+                ['siswa_id', 'kriteria_id'], ['nilai_input', 'jumlah_jawaban'])
+    kosong = [k_id for k_id in kriteria_ids if k_id not in rata]
+    if kosong:
+        NilaiSiswa.query.filter(NilaiSiswa.siswa_id == siswa_id, NilaiSiswa.kriteria_id.in_(kosong)) \
+            .delete(synchronize_session=False)
+
+    return {k_id: rata[k_id][0] if k_id in rata else None for k_id in kriteria_ids}
+
+
+def build_snapshot(siswa_id):
+    """Snapshot jawaban tersimpan siswa (format riwayat_jawaban hasil) dari JawabanSiswa"""
+    pertanyaan_map = get_pertanyaan_map()
+    rows = db.session.query(JawabanSiswa.pertanyaan_id, JawabanSiswa.nilai).filter(
+        JawabanSiswa.siswa_id == siswa_id).order_by(JawabanSiswa.pertanyaan_id.asc()).all()
+    snapshot = []
+    for p_id, nilai in rows:
+        info = pertanyaan_map.get(p_id)
+        if info:
+            _, k_kode, k_nama, teks = info
+            snapshot.append({'kriteria_kode': k_kode, 'kriteria_nama': k_nama,
+                             'pertanyaan_teks': teks, 'jawaban_nilai': nilai})
+    return snapshot
+
+
+def get_riwayat_aktif():
+    """Return: (periode_aktif, riwayat, pesan_error, kode) dari konteks siswa request ini"""
+    ctx = get_siswa_context()
+    if not ctx or not ctx['periode']:
+        return None, None, 'Tidak ada periode tahun ajaran yang aktif.', 400
+    if not ctx['riwayat']:
+        return ctx['periode'], None, 'Akses ditolak. Anda tidak terdaftar aktif.', 403
+    return ctx['periode'], ctx['riwayat'], None, None
+
+
+# --- GET FORM DATA (Kriteria & Existing Values) ---
+@siswa_bp.route('/form', methods=['GET'], strict_slashes=False)
+@jwt_required()
+def get_form():
+    current_user_id = get_jwt_identity()
+
+    # --- CEK ELIGIBILITY (dari konteks siswa, lihat siswa_context.py) ---
+    ctx = get_siswa_context()
+    is_eligible = bool(ctx and ctx['is_eligible'])
+    status_message = ""
+
+    if not ctx or not ctx['periode']:
+        status_message = "Sistem sedang tidak menerima penilaian (Periode Non-Aktif)."
+    elif not is_eligible:
+        status_message = "Anda tidak terdaftar aktif di periode ini (Mungkin sudah Lulus)."
+
+    # Jika tidak eligible, langsung return (Hemat resource)
+    if not is_eligible:
+        return jsonify({
+            'is_eligible': False,
+            'message': status_message,
+            'data': []
+        })
+
+    # Daftar kriteria sama untuk semua siswa -> bytes dari cache, hanya jawaban tersimpan yang per siswa
+    versi, data_body = get_form_body()
+    jawaban = {str(p_id): nilai for p_id, nilai in db.session.query(JawabanSiswa.pertanyaan_id, JawabanSiswa.nilai)
+               .filter(JawabanSiswa.siswa_id == current_user_id).all()}
+    jawaban_body = current_app.json.dumps(jawaban).encode('utf-8')
 
-    return jsonify({'is_eligible': True, 'data': data})
+    body = b'{"data":' + data_body + b',"is_eligible":true,"jawaban":' + jawaban_body + b'}'
+    response = Response(body, mimetype='application/json')
+    response.set_etag(f"form-{versi}-{hashlib.md5(jawaban_body).hexdigest()[:16]}")
+    response.cache_control.private = True
+    response.cache_control.no_cache = True  # Selalu revalidasi (eligibility dicek tiap request)
+    return response.make_conditional(request)
 
 
 # --- SAVE VALUES ---
@@ -98,54 +198,39 @@ def save_nilai():
     user_id = get_jwt_identity()
 
     # 1. Validasi Periode & Status Siswa
-    periode_aktif = Periode.query.filter_by(is_active=True).first()
-    if not periode_aktif:
-        return jsonify({'msg': 'Tidak ada periode tahun ajaran yang aktif.'}), 400
-
-    riwayat = RiwayatKelas.query.filter_by(
-        siswa_id=user_id,
-        periode_id=periode_aktif.id,
-        status_akhir='Aktif'
-    ).first()
-
-    if not riwayat:
-        return jsonify({'msg': 'Akses ditolak. Anda tidak terdaftar aktif.'}), 403
+    periode_aktif, riwayat, error_msg, code = get_riwayat_aktif()
+    if error_msg:
+        return jsonify({'msg': error_msg}), code
 
     # 2. Proses Input Data
     data = request.get_json()
     values = data.get('values', {})
-    temp_scores = {}
+    answers = {}
     snapshot_data = []
 
     try:
-        # A. Loop Input & Simpan ke NilaiSiswa
+        # A. Satu lintasan: jawaban valid + snapshot, lalu simpan jawaban & rata-rata NilaiSiswa
+        pertanyaan_map = get_pertanyaan_map()
         for key, val in values.items():
             try:
                 p_id = int(key)
-                pertanyaan = Pertanyaan.query.get(p_id)
-                if pertanyaan:
-                    k_id = pertanyaan.kriteria_id
-                    if k_id not in temp_scores: temp_scores[k_id] = []
-
-                    val_float = float(val) if val else 0
-                    temp_scores[k_id].append(val_float)
-
-                    snapshot_data.append({
-                        'kriteria_kode': pertanyaan.kriteria.kode,
-                        'kriteria_nama': pertanyaan.kriteria.nama,
-                        'pertanyaan_teks': pertanyaan.teks,
-                        'jawaban_nilai': val
-                    })
-            except ValueError:
+                info = pertanyaan_map.get(p_id)
+                if not info:
+                    continue
+                answers[p_id] = float(val) if val else 0
+            except (ValueError, TypeError):
                 continue
 
-        for k_id, scores in temp_scores.items():
-            avg_score = sum(scores) / len(scores)
-            nilai_obj = NilaiSiswa.query.filter_by(siswa_id=user_id, kriteria_id=k_id).first()
-            if not nilai_obj:
-                nilai_obj = NilaiSiswa(siswa_id=user_id, kriteria_id=k_id)
-                db.session.add(nilai_obj)
-            nilai_obj.nilai_input = avg_score
+            _, k_kode, k_nama, teks = info
+            snapshot_data.append({
+                'kriteria_kode': k_kode,
+                'kriteria_nama': k_nama,
+                'pertanyaan_teks': teks,
+                'jawaban_nilai': val
+            })
+
+        # Submit penuh: jawaban lama yang tidak ikut dikirim dihapus (sama dengan form yang dikirim)
+        apply_answers(int(user_id), answers, replace=True)
 
         # B. Buat Placeholder Hasil (Agar tidak error NOT NULL sebelum hitung)
         hasil = HasilRekomendasi.query.filter_by(siswa_id=user_id, periode_id=periode_aktif.id).first()
@@ -161,27 +246,119 @@ def save_nilai():
         # Simpan Snapshot Jawaban (History apa yang diisi user)
         hasil.detail_snapshot = snapshot_data
         hasil.tingkat_kelas = riwayat.tingkat_kelas
-
-        # COMMIT 1: Simpan Input Mentah & Placeholder dulu
-        db.session.commit()
+        # Naikkan versi input agar hasil lama terdeteksi basi, tandai menunggu dihitung
+        hasil.versi_input = (hasil.versi_input or 0) + 1
+        hasil.versi_hitung = None
+        db.session.flush()
 
         # -----------------------------------------------------------------
-        # C. TRIGGER PERHITUNGAN MOORA OTOMATIS
+        # C. PERHITUNGAN MOORA
         # -----------------------------------------------------------------
-        # Import lokal untuk menghindari circular import
-        from routes.moora import calculate_ranking
+        # Mode deferred: cukup satu commit, skor dihitung worker per batch (lihat worker.py)
+        if Config.SISWA_SCORING_MODE == 'deferred':
+            db.session.commit()
+            return jsonify({'msg': 'Data berhasil disimpan, hasil sedang dihitung.',
+                            'status': 'menunggu', 'versi_input': hasil.versi_input}), 202
 
-        # Jalankan perhitungan (ini akan update tabel HasilRekomendasi dengan skor real)
-        calculated_result, error_msg = calculate_ranking(periode_aktif.id, user_id)
+        # Mode sync: hitung dalam transaksi yang sama. Savepoint agar input tetap tersimpan
+        # (dan tetap menunggu dihitung) jika perhitungan gagal.
+        # Import lokal untuk menghindari circular import
+        from routes.moora import calculate_ranking_batch
 
-        if error_msg:
-            print(f"Warning Hitung Otomatis: {error_msg}")
-            # Kita tidak return error 500 karena data input sudah tersimpan.
-            # User tetap dapat notif sukses, tapi hasil mungkin belum keluar sempurna.
+        status = 'selesai'
+        try:
+            with db.session.begin_nested():
+                calculate_ranking_batch(periode_aktif.id, [user_id])
+        except Exception as e:
+            status = 'menunggu'
+            print(f"Warning Hitung Otomatis: {e}")
 
-        return jsonify({'msg': 'Data berhasil disimpan & dikalkulasi!'}), 200
+        db.session.commit()
+        return jsonify({'msg': 'Data berhasil disimpan & dikalkulasi!', 'status': status}), 200
 
     except Exception as e:
         db.session.rollback()
         print(f"ERROR SAVE: {e}")
-        return jsonify({'msg': f'Gagal menyimpan: {str(e)}'}), 500
\ No newline at end of file
+        return jsonify({'msg': f'Gagal menyimpan: {str(e)}'}), 500
+
+# --- AUTOSAVE JAWABAN (Hanya jawaban yang berubah) ---
+@siswa_bp.route('/answers', methods=['PATCH'])
+@jwt_required()
+def patch_answers():
+    """
+    Input: {'answers': {pertanyaan_id: nilai | null}}  (null = hapus jawaban)
+    Rata-rata NilaiSiswa kriteria terkait dihitung ulang, skor dihitung ulang saat hasil dibuka / oleh worker.
+    Sebelum submit pertama (/save) jawaban hanya draft: belum dihitung & belum dianggap mengisi.
+    """
+    user_id = get_jwt_identity()
+
+    periode_aktif, riwayat, error_msg, code = get_riwayat_aktif()
+    if error_msg:
+        return jsonify({'msg': error_msg}), code
+
+    data = request.get_json() or {}
+    raw = data.get('answers')
+    if not isinstance(raw, dict) or not raw:
+        return jsonify({'msg': 'Tidak ada jawaban yang dikirim.'}), 400
+
+    try:
+        answers = {int(key): (None if val is None or val == '' else float(val)) for key, val in raw.items()}
+    except (ValueError, TypeError):
+        return jsonify({'msg': 'Format jawaban tidak valid.'}), 400
+
+    try:
+        nilai = apply_answers(int(user_id), answers)
+        if nilai:
+            # Hasil lama jadi basi: naikkan versi input, tandai menunggu dihitung & segarkan snapshot jawaban
+            snapshot = build_snapshot(int(user_id))
+            diperbarui = HasilRekomendasi.query.filter_by(siswa_id=user_id, periode_id=periode_aktif.id).update(
+                {'versi_input': HasilRekomendasi.versi_input + 1, 'versi_hitung': None, 'detail_snapshot': snapshot},
+                synchronize_session=False)
+            # Belum ada hasil di periode ini: siswa yang pernah submit (periode lalu) ikut dihitung dari
+            # jawaban tersimpannya, jadi dibuatkan hasil menunggu. Siswa yang belum pernah submit
+            # hanya menyimpan draft (lihat routes/moora.get_siswa_ids_periode).
+            if not diperbarui and db.session.query(HasilRekomendasi.id).filter_by(siswa_id=user_id).first():
+                db.session.add(HasilRekomendasi(
+                    siswa_id=user_id,
+                    periode_id=periode_aktif.id,
+                    keputusan_terbaik="Sedang Menghitung...",
+                    tingkat_kelas=riwayat.tingkat_kelas,
+                    detail_snapshot=snapshot,
+                    versi_input=1,
+                    versi_hitung=None
+                ))
+        db.session.commit()
+    except Exception as e:
+        db.session.rollback()
+        print(f"ERROR AUTOSAVE: {e}")
+        return jsonify({'msg': f'Gagal menyimpan: {str(e)}'}), 500
+
+    return jsonify({'msg': 'Jawaban tersimpan', 'nilai': nilai})
+
+
+# --- STATUS SKORING (Polling setelah submit) ---
+@siswa_bp.route('/status', methods=['GET'])
+@jwt_required()
+def scoring_status():
+    user_id = get_jwt_identity()
+
+    ctx = get_siswa_context()
+    periode_aktif = ctx['periode'] if ctx else None
+    if not periode_aktif:
+        return jsonify({'msg': 'Tidak ada periode tahun ajaran yang aktif.'}), 400
+
+    hasil = db.session.query(HasilRekomendasi.versi_input, HasilRekomendasi.versi_hitung,
+                             HasilRekomendasi.keputusan_terbaik).filter_by(
+        siswa_id=user_id, periode_id=periode_aktif.id).first()
+    if not hasil:
+        return jsonify({'status': 'belum_mengisi'})
+
+    from routes.moora import get_engine_versions, versi_signature
+
+    # 'selesai' hanya jika hasil dihitung dari input & bobot terbaru
+    selesai = hasil.versi_hitung == versi_signature(hasil.versi_input, get_engine_versions())
+    return jsonify({
+        'status': 'selesai' if selesai else 'menunggu',
+        'versi_input': hasil.versi_input,
+        'keputusan': hasil.keputusan_terbaik if selesai else None
+    })
@@ -0,0 +1,80 @@
+# Konteks siswa per request (g.siswa): periode aktif, riwayat aktif & jurusan.
+# Dibangun sekali per request oleh before_request blueprint siswa & moora.
+# Periode aktif di-cache per proses dan di-invalidate lewat VERSI_PERIODE (routes/periode.activate);
+# versi dicek di query yang sama dengan user & riwayat, jadi cukup satu query per request.
+from collections import namedtuple
+
+from flask import g
+from flask_jwt_extended import verify_jwt_in_request, get_jwt, get_jwt_identity
+from flask_jwt_extended.exceptions import JWTExtendedException
+from jwt.exceptions import PyJWTError
+from sqlalchemy import and_
+
+from helpers import VERSI_PERIODE
+from models import db, User, Periode, RiwayatKelas, Setting
+
+# Salinan ringan periode aktif (aman dipakai lintas request/session)
+PeriodeAktif = namedtuple('PeriodeAktif', ['id', 'nama_periode'])
+
+_periode_cache = {'versi': None, 'periode': None}
+
+
+def _load_periode_aktif(versi):
+    periode = Periode.query.filter_by(is_active=True).first()
+    _periode_cache['periode'] = PeriodeAktif(periode.id, periode.nama_periode) if periode else None
+    _periode_cache['versi'] = versi
+    return _periode_cache['periode']
+
+
+def _query_user_riwayat(user_id, periode_id):
+    """Satu query: user + riwayat aktif di periode + versi periode saat ini"""
+    versi = db.session.query(Setting.value).filter(Setting.key == VERSI_PERIODE).scalar_subquery()
+    return db.session.query(User, RiwayatKelas, versi).outerjoin(RiwayatKelas, and_(
+        RiwayatKelas.siswa_id == User.id,
+        RiwayatKelas.periode_id == periode_id,
+        RiwayatKelas.status_akhir == 'Aktif'
+    )).filter(User.id == user_id).first()
+
+
+def build_siswa_context(user_id):
+    """
+    Return dict: periode (PeriodeAktif/None), riwayat (RiwayatKelas aktif/None),
+    jurusan_id, is_eligible. None jika user tidak ditemukan.
+    """
+    periode = _periode_cache['periode']
+    row = _query_user_riwayat(user_id, periode.id if periode else None)
+    if not row:
+        return None
+
+    user, riwayat, versi = row
+    versi = versi or '0'
+    if versi != _periode_cache['versi']:
+        # Periode aktif berganti (jarang): muat ulang lalu cek riwayat di periode baru
+        baru = _load_periode_aktif(versi)
+        if baru != periode:
+            periode = baru
+            riwayat = _query_user_riwayat(user_id, periode.id if periode else None)[1]
+
+    return {
+        'periode': periode,
+        'riwayat': riwayat,
+        'jurusan_id': user.jurusan_id,
+        'is_eligible': periode is not None and riwayat is not None
+    }
+
+
+def get_siswa_context():
+    """Konteks siswa request ini (dibangun saat pertama dipakai jika belum dimuat before_request)"""
+    if 'siswa' not in g:
+        g.siswa = build_siswa_context(get_jwt_identity())
+    return g.siswa
+
+
+def load_siswa_context():
+    """before_request: muat konteks untuk request siswa; token tidak valid dibiarkan ditolak jwt_required"""
+    try:
+        verify_jwt_in_request(optional=True)
+    except (JWTExtendedException, PyJWTError):
+        return
+    if get_jwt().get('role') == 'siswa':
+        get_siswa_context()
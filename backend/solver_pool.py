@@ -0,0 +1,136 @@
+# Executor solver BWM: LP dijalankan di process pool terpisah (ukuran = Config.SOLVER_WORKERS)
+# agar solve yang lambat tidak memblokir worker request. Antrian dibatasi; jika penuh
+# request langsung ditolak dengan 503 + Retry-After.
+# Pool & antrian milik satu proses web: dengan N worker gunicorn ada N pool (lihat config.py).
+import threading
+from concurrent.futures import ProcessPoolExecutor, TimeoutError as FutureTimeout
+
+import numpy as np
+from flask import jsonify
+
+from config import Config
+from spk_engine.bwm import solve_bwm, input_consistency_ratio, CONSISTENT_TOL
+
+
+class SolverError(Exception):
+    pass
+
+
+class SolverBusy(SolverError):
+    """Antrian solver penuh"""
+
+
+class SolverTimeout(SolverError):
+    """Solve melebihi SOLVER_TIMEOUT"""
+
+
+class SolverInfeasible(SolverError):
+    """LP tidak menemukan solusi (bukan masalah beban, tidak perlu dicoba ulang)"""
+
+
+_executor = None
+_executor_lock = threading.Lock()
+# Slot = solve yang sedang antri/berjalan. Dilepas saat proses selesai (bukan saat request timeout).
+_slots = threading.BoundedSemaphore(Config.SOLVER_QUEUE_SIZE)
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ProcessPoolExecutor(max_workers=Config.SOLVER_WORKERS)
+    return _executor
+
+
+def _submit(fn, args, timeout, wait=None):
+    """Ambil satu slot antrian lalu kirim fn ke pool. wait=None -> langsung SolverBusy jika penuh."""
+    acquired = _slots.acquire(timeout=wait) if wait else _slots.acquire(blocking=False)
+    if not acquired:
+        raise SolverBusy('Server sedang sibuk menghitung, coba lagi sebentar.')
+
+    try:
+        future = get_executor().submit(fn, *args, time_limit=timeout)
+    except Exception:
+        _slots.release()
+        raise
+    future.add_done_callback(lambda f: _slots.release())
+    return future
+
+
+def run_solver(fn, *args, timeout=None):
+    """
+    Jalankan fn(*args, time_limit=timeout) di process pool dan tunggu hasilnya.
+    fn harus fungsi level-modul tanpa akses DB (misal spk_engine.bwm.solve_bwm).
+    """
+    timeout = timeout or Config.SOLVER_TIMEOUT
+    if Config.SOLVER_WORKERS <= 0:
+        return fn(*args, time_limit=timeout)
+
+    future = _submit(fn, args, timeout)
+    try:
+        # Sedikit kelonggaran di atas time_limit HiGHS untuk overhead antar proses
+        return future.result(timeout=timeout + 1)
+    except FutureTimeout:
+        future.cancel()
+        raise SolverTimeout('Perhitungan melebihi batas waktu.')
+
+
+def map_solver(fn, arg_list, timeout=None):
+    """
+    Versi banyak-input dari run_solver: semua solve berjalan paralel di pool, hasil sesuai urutan input.
+    Jika antrian penuh, menunggu slot kosong (maks. timeout) sebelum menyerah dengan SolverBusy.
+    """
+    timeout = timeout or Config.SOLVER_TIMEOUT
+    if Config.SOLVER_WORKERS <= 0:
+        return [fn(*args, time_limit=timeout) for args in arg_list]
+
+    futures = []
+    try:
+        for args in arg_list:
+            futures.append(_submit(fn, args, timeout, wait=timeout))
+        return [future.result(timeout=timeout + 1) for future in futures]
+    except FutureTimeout:
+        raise SolverTimeout('Perhitungan melebihi batas waktu.')
+    finally:
+        for future in futures:
+            future.cancel()  # Tidak berpengaruh pada solve yang sudah selesai/berjalan
+
+
+def solve_bwm_pooled(a_b, a_w, best_idx, worst_idx):
+    """solve_bwm lewat process pool; input konsisten penuh tetap dihitung langsung (analitik, tanpa LP)"""
+    if input_consistency_ratio(a_b, a_w, best_idx, worst_idx) <= CONSISTENT_TOL:
+        return solve_bwm(a_b, a_w, best_idx, worst_idx)
+    return run_solver(solve_bwm, a_b, a_w, best_idx, worst_idx)
+
+
+def solve_bwm_many(arg_list):
+    """
+    Banyak solve_bwm sekaligus, arg_list berisi (a_b, a_w, best_idx, worst_idx).
+    Input konsisten penuh dihitung langsung, input identik hanya di-solve sekali.
+    """
+    results = [None] * len(arg_list)
+    pending = {}
+    for i, (a_b, a_w, best_idx, worst_idx) in enumerate(arg_list):
+        if input_consistency_ratio(a_b, a_w, best_idx, worst_idx) <= CONSISTENT_TOL:
+            results[i] = solve_bwm(a_b, a_w, best_idx, worst_idx)
+        else:
+            key = (tuple(np.asarray(a_b, dtype=float)), tuple(np.asarray(a_w, dtype=float)), best_idx, worst_idx)
+            pending.setdefault(key, []).append(i)
+
+    solutions = map_solver(solve_bwm, [(np.array(k[0]), np.array(k[1]), k[2], k[3]) for k in pending])
+    for indices, solution in zip(pending.values(), solutions):
+        for i in indices:
+            results[i] = solution
+    return results
+
+
+def solver_error_response(e):
+    """503 + Retry-After untuk antrian penuh / solve terlalu lama, 422 jika LP tidak punya solusi"""
+    response = jsonify({'msg': str(e)})
+    if isinstance(e, SolverInfeasible):
+        response.status_code = 422
+        return response
+    response.status_code = 503
+    response.headers['Retry-After'] = str(Config.SOLVER_RETRY_AFTER)
+    return response
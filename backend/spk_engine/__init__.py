@@ -0,0 +1,11 @@
+# Engine MCDM (MOORA) ter-vektorisasi, dipakai oleh routes/moora.py & routes/simulation.py
+from spk_engine.moora import (
+    type_signs,
+    vector_divisors,
+    vector_normalize,
+    ratio_scores,
+    reference_point_scores,
+    rank_order,
+    rank_positions,
+    moora,
+)
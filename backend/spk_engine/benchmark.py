@@ -0,0 +1,136 @@
+# Micro-benchmark engine SPK: implementasi loop lama vs engine ter-vektorisasi
+# (MOORA) dan penyusunan LP BWM baris-per-baris vs sekaligus (dense / sparse).
+# Jalankan dari folder backend:  python -m spk_engine.benchmark
+import math
+import time
+
+import numpy as np
+
+from scipy import sparse
+from scipy.optimize import linprog
+
+from spk_engine.moora import moora, vector_normalize, ratio_scores
+from spk_engine.bwm import build_bwm_lp, build_group_bwm_lp, solve_bwm, _solve_lp, DENSE_MAX_ROWS
+
+
+def loop_moora(matrix, weights, signs):
+    """Referensi: pola loop Python lama (routes/moora.py sebelum engine)"""
+    rows, cols = matrix.shape
+    norm_matrix = np.zeros((rows, cols))
+    for j in range(cols):
+        denom = math.sqrt(sum(matrix[i, j] ** 2 for i in range(rows)))
+        for i in range(rows):
+            norm_matrix[i, j] = matrix[i, j] / denom if denom > 0 else 0
+
+    y_scores = []
+    for i in range(rows):
+        yi = 0
+        for j in range(cols):
+            yi += norm_matrix[i, j] * weights[j] * signs[j]
+        y_scores.append(yi)
+    return y_scores
+
+
+def loop_bwm_lp(a_b, a_w, best_idx, worst_idx):
+    """Referensi: penyusunan A_ub baris-per-baris (list dense) seperti sebelum engine"""
+    n = len(a_b)
+    A_ub, b_ub = [], []
+    for j in range(n):
+        if j == best_idx:
+            continue
+        row1 = np.zeros(n + 1)
+        row1[best_idx], row1[j], row1[-1] = 1, -a_b[j], -1
+        row2 = np.zeros(n + 1)
+        row2[best_idx], row2[j], row2[-1] = -1, a_b[j], -1
+        A_ub += [row1, row2]
+        b_ub += [0, 0]
+    for j in range(n):
+        if j == worst_idx:
+            continue
+        row1 = np.zeros(n + 1)
+        row1[j], row1[worst_idx], row1[-1] = 1, -a_w[j], -1
+        row2 = np.zeros(n + 1)
+        row2[j], row2[worst_idx], row2[-1] = -1, a_w[j], -1
+        A_ub += [row1, row2]
+        b_ub += [0, 0]
+    c = np.zeros(n + 1)
+    c[-1] = 1
+    A_eq = [np.ones(n + 1)]
+    A_eq[0][-1] = 0
+    return c, A_ub, b_ub, A_eq, [1]
+
+
+def loop_bwm_solve(a_b, a_w, best_idx, worst_idx):
+    c, A_ub, b_ub, A_eq, b_eq = loop_bwm_lp(a_b, a_w, best_idx, worst_idx)
+    bounds = [(0, None) for _ in range(len(c))]
+    return linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=bounds, method='highs')
+
+
+def best_of(fn, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main():
+    rng = np.random.default_rng(42)
+
+    print("1) Satu matriks M x N (simulasi)")
+    print(f"{'M x N':>12} {'loop (ms)':>12} {'engine (ms)':>12} {'speedup':>9}")
+    for m, n in [(3, 8), (50, 10), (500, 20), (5000, 20)]:
+        matrix = rng.integers(1, 6, size=(m, n)).astype(float)
+        weights = rng.random(n)
+        signs = np.where(rng.random(n) < 0.8, 1.0, -1.0)
+
+        t_loop = best_of(lambda: loop_moora(matrix, weights, signs), repeat=1 if m >= 5000 else 5)
+        t_vec = best_of(lambda: moora(matrix, weights, signs=signs))
+        assert np.allclose(loop_moora(matrix, weights, signs), moora(matrix, weights, signs=signs)['scores'])
+        print(f"{f'{m} x {n}':>12} {t_loop * 1000:>12.3f} {t_vec * 1000:>12.3f} {t_loop / t_vec:>8.0f}x")
+
+    print("\n2) Kohort siswa: S x 3 x N (per siswa loop vs satu batch)")
+    print(f"{'S':>12} {'loop (ms)':>12} {'engine (ms)':>12} {'speedup':>9}")
+    for s in [100, 1000, 3000]:
+        tensor = rng.integers(1, 6, size=(s, 3, 8)).astype(float)
+        weights = rng.random(8)
+        signs = np.ones(8)
+
+        t_loop = best_of(lambda: [loop_moora(tensor[i], weights, signs) for i in range(s)], repeat=1)
+        t_vec = best_of(lambda: ratio_scores(vector_normalize(tensor), weights, signs))
+        print(f"{s:>12} {t_loop * 1000:>12.3f} {t_vec * 1000:>12.3f} {t_loop / t_vec:>8.0f}x")
+
+
+    print("\n3) LP BWM: n kriteria (setup = penyusunan matriks, total = setup + solve HiGHS)")
+    print(f"{'n':>6} {'setup loop':>12} {'setup engine':>13} {'total loop':>12} {'total engine':>13}   (ms)")
+    for n in [5, 10, 20, 50, 100, 200]:
+        a_b = rng.integers(1, 10, size=n).astype(float)
+        a_w = rng.integers(1, 10, size=n).astype(float)
+        a_b[0], a_w[-1] = 1, 1
+
+        t_setup_loop = best_of(lambda: loop_bwm_lp(a_b, a_w, 0, n - 1))
+        t_setup_vec = best_of(lambda: build_bwm_lp(a_b, a_w, 0, n - 1))
+        t_loop = best_of(lambda: loop_bwm_solve(a_b, a_w, 0, n - 1))
+        t_vec = best_of(lambda: solve_bwm(a_b, a_w, 0, n - 1))
+        assert np.isclose(loop_bwm_solve(a_b, a_w, 0, n - 1).x[-1], solve_bwm(a_b, a_w, 0, n - 1)[1])
+        print(f"{n:>6} {t_setup_loop * 1000:>12.3f} {t_setup_vec * 1000:>13.3f} "
+              f"{t_loop * 1000:>12.3f} {t_vec * 1000:>13.3f}")
+
+    print(f"\n4) LP Group BWM: A_ub dense vs CSR (engine: dense jika baris <= {DENSE_MAX_ROWS}), total solve")
+    print(f"{'pakar x n':>12} {'baris':>8} {'dense':>10} {'CSR':>10}   (ms)")
+    for num_expert, n in [(1, 5), (1, 10), (1, 20), (3, 10), (5, 20), (10, 20), (20, 30), (50, 30), (100, 40)]:
+        a_b = rng.integers(1, 10, size=(num_expert, n)).astype(float)
+        a_w = rng.integers(1, 10, size=(num_expert, n)).astype(float)
+        a_b[:, 0], a_w[:, -1] = 1, 1
+
+        c, A_ub, b_ub, A_eq, b_eq = build_group_bwm_lp(a_b, a_w, 0, n - 1)
+        dense = (c, sparse.csr_matrix(A_ub).toarray(), b_ub, A_eq, b_eq)
+        csr = (c, sparse.csr_matrix(A_ub), b_ub, A_eq, b_eq)
+        t_dense = best_of(lambda: _solve_lp(dense), repeat=20)
+        t_csr = best_of(lambda: _solve_lp(csr), repeat=20)
+        print(f"{f'{num_expert} x {n}':>12} {A_ub.shape[0]:>8} {t_dense * 1000:>10.3f} {t_csr * 1000:>10.3f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,197 @@
+import numpy as np
+from scipy import sparse
+from scipy.optimize import linprog
+
+# Model linear BWM Rezaei (2016): minimalkan ksi dengan
+#   |w_B - a_Bj * w_j| <= ksi,  |w_j - a_jW * w_W| <= ksi,  sum(w) = 1,  w >= 0
+# Variabel keputusan: [w1, ..., wn, ksi]
+
+# Consistency Index per nilai a_BW (Tabel 2.1 Proposal Hal 29)
+CI_TABLE = {1: 0.00, 2: 0.44, 3: 1.00, 4: 1.63, 5: 2.30, 6: 3.00, 7: 3.73, 8: 4.47, 9: 5.23}
+
+# Toleransi untuk menganggap perbandingan konsisten penuh (a_Bj * a_jW == a_BW)
+CONSISTENT_TOL = 1e-9
+
+# Ambang CR berbasis input per a_BW (baris) dan jumlah kriteria n = 3..9 (kolom),
+# Liang, Brunelli & Rezaei (2020), "Consistency issues in the best worst method: Measurements and thresholds".
+# Skala berbeda dengan CR = ksi / CI (batas 0.1): hanya umpan balik saat mengisi, validasi simpan tetap CR LP.
+INPUT_CR_THRESHOLDS = {
+    3: (0.1667, 0.1667, 0.1667, 0.1667, 0.1667, 0.1667, 0.1667),
+    4: (0.1121, 0.1529, 0.1898, 0.2206, 0.2527, 0.2577, 0.2683),
+    5: (0.1354, 0.1994, 0.2306, 0.2546, 0.2716, 0.2844, 0.2960),
+    6: (0.1330, 0.1990, 0.2643, 0.3044, 0.3144, 0.3221, 0.3262),
+    7: (0.1294, 0.2457, 0.2819, 0.3029, 0.3144, 0.3251, 0.3403),
+    8: (0.1309, 0.2521, 0.2958, 0.3154, 0.3408, 0.3620, 0.3657),
+    9: (0.1359, 0.2681, 0.3062, 0.3337, 0.3517, 0.3620, 0.3662),
+}
+
+# Batas baris A_ub untuk matriks dense. LP kecil (ukuran umum: 1 pakar / grup kecil, n <= 20) lebih cepat
+# dengan A_ub dense di HiGHS; CSR baru unggul mulai beberapa ribu baris (python -m spk_engine.benchmark, bagian 4)
+DENSE_MAX_ROWS = 1000
+
+# Penyeimbang agar pakar dengan CR = 0 tidak mendapat bobot tak hingga
+CR_EPS = 0.01
+
+
+def _comparison_pairs(a_b, a_w, best_idx, worst_idx):
+    """
+    Semua pasangan (u, v, a) -> |w_u - a * w_v| <= ksi, untuk satu atau banyak pakar.
+    a_b, a_w: (E, n); NaN = kriteria tidak dibandingkan oleh pakar tsb.
+    Baris degenerate (best vs best, worst vs worst) dibuang.
+    Return: (expert, u, v, a) masing-masing array 1D
+    """
+    num_expert, n = a_b.shape
+    cols = np.arange(n)
+
+    mask_b = ~np.isnan(a_b) & (cols != best_idx)
+    mask_w = ~np.isnan(a_w) & (cols != worst_idx)
+    eb, jb = np.nonzero(mask_b)
+    ew, jw = np.nonzero(mask_w)
+
+    expert = np.concatenate([eb, ew])
+    u = np.concatenate([np.full(jb.shape, best_idx), jw])
+    v = np.concatenate([jb, np.full(jw.shape, worst_idx)])
+    a = np.concatenate([a_b[eb, jb], a_w[ew, jw]])
+    return expert, u, v, a
+
+
+def build_group_bwm_lp(a_b, a_w, best_idx, worst_idx, expert_weights=None):
+    """
+    Susun LP BWM (satu atau banyak pakar sekaligus) tanpa loop per baris. A_ub dense jika baris
+    <= DENSE_MAX_ROWS, selain itu sparse CSR.
+    Tiap batasan pakar e dikali bobot pakar lambda_e:  lambda_e * |w_u - a * w_v| <= ksi
+    Return: (c, A_ub, b_ub, A_eq, b_eq)
+    """
+    a_b = np.atleast_2d(np.asarray(a_b, dtype=float))
+    a_w = np.atleast_2d(np.asarray(a_w, dtype=float))
+    n = a_b.shape[1]
+
+    expert, u, v, a = _comparison_pairs(a_b, a_w, best_idx, worst_idx)
+    m = u.shape[0]
+    scale = np.ones(m) if expert_weights is None else np.asarray(expert_weights, dtype=float)[expert]
+
+    # Tepat 3 non-zero per baris (w_u, w_v, ksi) -> dense / CSR langsung dari (data, indices, indptr)
+    # Baris 0..m-1  :  w_u - a*w_v - ksi <= 0
+    # Baris m..2m-1 : -w_u + a*w_v - ksi <= 0
+    indices = np.tile(np.column_stack([u, v, np.full(m, n)]), (2, 1))
+    data = np.empty((2 * m, 3))
+    data[:m, 0], data[:m, 1] = scale, -a * scale
+    data[m:, 0], data[m:, 1] = -scale, a * scale
+    data[:, 2] = -1
+
+    if 2 * m <= DENSE_MAX_ROWS:
+        A_ub = np.zeros((2 * m, n + 1))
+        A_ub[np.arange(2 * m)[:, None], indices] = data  # u != v, tidak ada kolom yang bertabrakan
+    else:
+        A_ub = sparse.csr_matrix((data.ravel(), indices.ravel(), np.arange(0, 6 * m + 1, 3)), shape=(2 * m, n + 1))
+    b_ub = np.zeros(2 * m)
+
+    c = np.zeros(n + 1)
+    c[-1] = 1  # Minimalkan ksi
+
+    A_eq = np.ones((1, n + 1))
+    A_eq[0, -1] = 0
+    b_eq = np.ones(1)
+
+    return c, A_ub, b_ub, A_eq, b_eq
+
+
+def build_bwm_lp(a_b, a_w, best_idx, worst_idx):
+    """LP BWM satu pakar (lihat build_group_bwm_lp)"""
+    return build_group_bwm_lp(a_b, a_w, best_idx, worst_idx)
+
+
+def _solve_lp(lp, time_limit=None):
+    c, A_ub, b_ub, A_eq, b_eq = lp
+    options = {'time_limit': time_limit} if time_limit else None
+
+    # Batasan Lower Bound: wj >= 0, ksi >= 0
+    res = linprog(c, A_ub=A_ub, b_ub=b_ub, A_eq=A_eq, b_eq=b_eq, bounds=(0, None), method='highs',
+                  options=options)
+    if not res.success:
+        return None
+
+    return res.x[:-1], float(res.x[-1])
+
+
+def _anchored(a_b, a_w, best_idx, worst_idx):
+    """Salinan vektor perbandingan dengan a_BB = a_WW = 1"""
+    a_b = np.array(a_b, dtype=float)
+    a_w = np.array(a_w, dtype=float)
+    a_b[best_idx] = 1
+    a_w[worst_idx] = 1
+    return a_b, a_w
+
+
+def input_consistency_ratio(a_b, a_w, best_idx, worst_idx):
+    """
+    CR berbasis input (tanpa LP), O(n):
+      CR_I = max_j |a_Bj * a_jW - a_BW| / (a_BW^2 - a_BW)
+    0 berarti konsisten penuh.
+    """
+    a_b, a_w = _anchored(a_b, a_w, best_idx, worst_idx)
+    a_bw = a_b[worst_idx]
+    deviation = float(np.max(np.abs(a_b * a_w - a_bw)))
+    if a_bw <= 1:
+        # Rumus tidak terdefinisi (a_BW = 1): hanya bisa konsisten (0) atau tidak (1)
+        return 0.0 if deviation <= CONSISTENT_TOL else 1.0
+    return deviation / (a_bw ** 2 - a_bw)
+
+
+def input_cr_threshold(a_bw, n):
+    """Ambang CR berbasis input untuk a_BW & n (di luar tabel dijepit ke 3..9)"""
+    row = INPUT_CR_THRESHOLDS[int(min(max(round(a_bw), 3), 9))]
+    return row[min(max(n, 3), 9) - 3]
+
+
+def analytic_weights(a_b, best_idx):
+    """Solusi eksak untuk input konsisten penuh: w_j sebanding 1 / a_Bj (ksi = 0)"""
+    a_b = np.array(a_b, dtype=float)
+    a_b[best_idx] = 1
+    weights = 1.0 / a_b
+    return weights / weights.sum()
+
+
+def solve_bwm(a_b, a_w, best_idx, worst_idx, time_limit=None):
+    """
+    Solve BWM. Input konsisten penuh langsung memakai solusi analitik (tanpa solver),
+    selain itu LP dengan HiGHS (dibatasi time_limit detik jika diisi).
+    Return (weights, ksi) atau None jika tidak ada solusi.
+    """
+    if input_consistency_ratio(a_b, a_w, best_idx, worst_idx) <= CONSISTENT_TOL:
+        return analytic_weights(a_b, best_idx), 0.0
+    return _solve_lp(build_bwm_lp(a_b, a_w, best_idx, worst_idx), time_limit)
+
+
+def cr_expert_weights(crs):
+    """Bobot pakar dari CR: makin konsisten makin besar, dinormalisasi agar maksimum = 1"""
+    crs = np.asarray(crs, dtype=float)
+    weights = 1.0 / (np.maximum(crs, 0) + CR_EPS)
+    return weights / weights.max()
+
+
+def solve_group_bwm(a_b, a_w, best_idx, worst_idx, expert_weights=None, time_limit=None):
+    """
+    Group BWM: satu LP untuk semua pakar (E x n, NaN = tidak dibandingkan) -> satu vektor bobot konsensus.
+    Return (weights, ksi, deviations) atau None. deviations[e] = max |w_u - a * w_v| pakar e pada bobot konsensus.
+    """
+    a_b = np.atleast_2d(np.asarray(a_b, dtype=float))
+    a_w = np.atleast_2d(np.asarray(a_w, dtype=float))
+
+    solution = _solve_lp(build_group_bwm_lp(a_b, a_w, best_idx, worst_idx, expert_weights), time_limit)
+    if solution is None:
+        return None
+
+    weights, ksi = solution
+    expert, u, v, a = _comparison_pairs(a_b, a_w, best_idx, worst_idx)
+    residual = np.abs(weights[u] - a * weights[v])
+
+    deviations = np.zeros(a_b.shape[0])
+    np.maximum.at(deviations, expert, residual)
+    return weights, ksi, deviations
+
+
+def consistency_ratio(ksi, a_bw):
+    """CR = ksi / CI(a_BW)"""
+    ci = CI_TABLE.get(int(a_bw), 5.23)
+    return ksi / ci if ci > 0 else 0
@@ -0,0 +1,86 @@
+import numpy as np
+
+# Semua fungsi bekerja pada matriks M x N (alternatif x kriteria) maupun batch
+# bertumpuk (..., M, N), misal tensor S x 3 x N untuk satu kohort siswa.
+
+
+def type_signs(types):
+    """List atribut ('benefit'/'cost') -> vektor tanda (+1 benefit, -1 cost)"""
+    return np.array([1.0 if t == 'benefit' else -1.0 for t in types])
+
+
+def vector_divisors(matrix):
+    """Pembagi normalisasi vektor per kolom: sqrt(sum x_ij^2) atas semua alternatif -> (..., 1, N)"""
+    matrix = np.asarray(matrix)
+    return np.sqrt(np.sum(matrix ** 2, axis=-2, keepdims=True))
+
+
+def vector_normalize(matrix, divisors=None):
+    """Normalisasi vektor MOORA: x_ij / sqrt(sum_i x_ij^2). Kolom dengan pembagi 0 -> 0."""
+    matrix = np.asarray(matrix)
+    if divisors is None:
+        divisors = vector_divisors(matrix)
+    out = np.zeros(matrix.shape, dtype=np.result_type(matrix.dtype, np.float32))
+    return np.divide(matrix, divisors, out=out, where=divisors > 0)
+
+
+def ratio_scores(norm_matrix, weights, signs=None):
+    """
+    Ratio system MOORA: Yi = sum(benefit w_j x*_ij) - sum(cost w_j x*_ij).
+    weights boleh (N,) atau (..., N) (satu vektor bobot per matriks dalam batch).
+    Return: (..., M)
+    """
+    # Bobot & tanda mengikuti dtype matriks (tanda float64 akan menaikkan matmul float32 ke float64)
+    weights = np.asarray(weights, dtype=norm_matrix.dtype)
+    if signs is not None:
+        weights = weights * np.asarray(signs, dtype=norm_matrix.dtype)
+    return np.matmul(norm_matrix, weights[..., None])[..., 0]
+
+
+def reference_point_scores(norm_matrix, weights, signs=None):
+    """
+    Reference point MOORA (Tchebycheff): jarak maksimum tiap alternatif ke titik referensi
+    (maks untuk benefit, min untuk cost) pada matriks ternormalisasi berbobot.
+    Semakin KECIL semakin baik. Return: (..., M)
+    """
+    weighted = norm_matrix * np.asarray(weights, dtype=norm_matrix.dtype)[..., None, :]
+    if signs is None:
+        signs = np.ones(norm_matrix.shape[-1])
+    reference = np.where(signs > 0,
+                         np.max(weighted, axis=-2, keepdims=True),
+                         np.min(weighted, axis=-2, keepdims=True))
+    return np.max(np.abs(reference - weighted), axis=-1)
+
+
+def rank_order(scores, descending=True):
+    """Index alternatif dari peringkat 1 ke bawah (sepanjang sumbu terakhir)"""
+    order = np.argsort(scores, axis=-1)
+    return order[..., ::-1] if descending else order
+
+
+def rank_positions(order):
+    """Kebalikan rank_order: peringkat (1 = terbaik) tiap alternatif sesuai urutan input"""
+    order = np.asarray(order)
+    ranks = np.empty_like(order)
+    positions = np.broadcast_to(np.arange(1, order.shape[-1] + 1), order.shape)
+    np.put_along_axis(ranks, order, positions, axis=-1)
+    return ranks
+
+
+def moora(matrix, weights, types=None, signs=None):
+    """
+    Hitung MOORA lengkap untuk satu matriks atau batch.
+    Return dict: divisors (..., N), norm (..., M, N), scores (..., M), order (..., M)
+    """
+    if signs is None:
+        signs = type_signs(types) if types is not None else None
+    matrix = np.asarray(matrix)
+    divisors = vector_divisors(matrix)
+    norm = vector_normalize(matrix, divisors)
+    scores = ratio_scores(norm, weights, signs)
+    return {
+        'divisors': divisors[..., 0, :],
+        'norm': norm,
+        'scores': scores,
+        'order': rank_order(scores)
+    }
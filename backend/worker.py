@@ -0,0 +1,177 @@
+# Worker hitung ulang HasilRekomendasi berbasis tabel job_hitungs (tanpa broker eksternal).
+# Job dibuat otomatis setiap bobot BWM / kriteria / nilai statis berubah, lalu diproses
+# per-chunk oleh proses worker:  flask run-worker
+# Worker yang sama juga menghitung submit siswa yang ditunda (SISWA_SCORING_MODE='deferred')
+# per batch kecil setiap SCORING_INTERVAL detik.
+import time
+from datetime import datetime
+
+from config import Config
+from models import db, JobHitung, Periode, HasilRekomendasi
+
+# Jumlah siswa per chunk (satu upsert + satu commit per chunk)
+JOB_CHUNK_SIZE = 500
+POLL_INTERVAL = 2  # detik
+
+
+def enqueue_recalc(alasan, periode_id=None):
+    """
+    Daftarkan job hitung ulang untuk periode (default: periode aktif).
+    Jika sudah ada job 'pending' untuk periode yang sama, job itu dipakai ulang.
+    Tidak melakukan commit (ikut transaksi pemanggil).
+    """
+    if periode_id is None:
+        periode = Periode.query.filter_by(is_active=True).first()
+        if not periode:
+            return None
+        periode_id = periode.id
+
+    job = JobHitung.query.filter_by(periode_id=periode_id, status='pending').first()
+    if job:
+        if alasan not in (job.alasan or '').split(','):
+            job.alasan = f"{job.alasan},{alasan}" if job.alasan else alasan
+        return job
+
+    job = JobHitung(periode_id=periode_id, status='pending', alasan=alasan, total=0, processed=0)
+    db.session.add(job)
+    db.session.flush()  # Dapat ID job
+    return job
+
+
+def job_to_dict(job):
+    return {
+        'id': job.id,
+        'periode_id': job.periode_id,
+        'status': job.status,
+        'alasan': job.alasan,
+        'total': job.total,
+        'processed': job.processed,
+        'progress': round(job.processed / job.total * 100, 1) if job.total else (100.0 if job.status == 'done' else 0.0),
+        'pesan_error': job.pesan_error,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at
+    }
+
+
+def claim_next_job():
+    """Ambil job pending tertua dan tandai 'running' (aman jika ada lebih dari satu worker)"""
+    job = JobHitung.query.filter_by(status='pending').order_by(JobHitung.id.asc()).first()
+    if not job:
+        return None
+
+    claimed = JobHitung.query.filter_by(id=job.id, status='pending') \
+        .update({'status': 'running', 'started_at': datetime.now()}, synchronize_session=False)
+    db.session.commit()
+    if not claimed:
+        return None  # Sudah diambil worker lain
+
+    return JobHitung.query.get(job.id)
+
+
+def run_job(job):
+    """Hitung ulang semua siswa periode job, per chunk, sambil mencatat progress"""
+    from routes.moora import calculate_ranking_batch, get_siswa_ids_periode
+
+    try:
+        siswa_ids = get_siswa_ids_periode(job.periode_id)
+        job.total = len(siswa_ids)
+        job.processed = 0
+        db.session.commit()
+
+        for start in range(0, len(siswa_ids), JOB_CHUNK_SIZE):
+            chunk = siswa_ids[start:start + JOB_CHUNK_SIZE]
+            calculate_ranking_batch(job.periode_id, chunk)
+            job.processed += len(chunk)
+            db.session.commit()
+
+        job.status = 'done'
+        job.finished_at = datetime.now()
+        db.session.commit()
+
+    except Exception as e:
+        db.session.rollback()
+        job.status = 'failed'
+        job.pesan_error = str(e)
+        job.finished_at = datetime.now()
+        db.session.commit()
+
+    return job
+
+
+def requeue_running_jobs():
+    """Kembalikan job 'running' yang tertinggal (worker mati di tengah jalan) ke antrian"""
+    count = JobHitung.query.filter_by(status='running') \
+        .update({'status': 'pending'}, synchronize_session=False)
+    db.session.commit()
+    return count
+
+
+def score_pending_submissions(limit=None):
+    """
+    Hitung hasil siswa yang menunggu skoring (versi_hitung NULL) di periode aktif, satu batch.
+    Siswa yang menyimpan ulang selama batch berjalan ditandai menunggu lagi.
+    Return: jumlah siswa yang dihitung.
+    """
+    from routes.moora import calculate_ranking_batch
+
+    periode = Periode.query.filter_by(is_active=True).first()
+    if not periode:
+        return 0
+
+    pending = dict(db.session.query(HasilRekomendasi.siswa_id, HasilRekomendasi.versi_input).filter(
+        HasilRekomendasi.periode_id == periode.id,
+        HasilRekomendasi.versi_hitung.is_(None)
+    ).limit(limit or Config.SCORING_BATCH_SIZE).all())
+    if not pending:
+        return 0
+
+    calculate_ranking_batch(periode.id, list(pending))
+    db.session.commit()
+
+    berubah = [siswa_id for siswa_id, versi_input in db.session.query(
+        HasilRekomendasi.siswa_id, HasilRekomendasi.versi_input).filter(
+        HasilRekomendasi.periode_id == periode.id,
+        HasilRekomendasi.siswa_id.in_(list(pending))
+    ).all() if versi_input != pending[siswa_id]]
+    if berubah:
+        HasilRekomendasi.query.filter(
+            HasilRekomendasi.periode_id == periode.id,
+            HasilRekomendasi.siswa_id.in_(berubah)
+        ).update({'versi_hitung': None}, synchronize_session=False)
+        db.session.commit()
+
+    return len(pending)
+
+
+def run_worker(once=False, poll_interval=POLL_INTERVAL):
+    """Loop utama worker. Jika once=True, proses antrian sampai kosong lalu berhenti."""
+    last_poll = 0
+    while True:
+        # Submit siswa didahulukan (batch kecil, latensi rendah)
+        try:
+            scored = score_pending_submissions()
+        except Exception as e:
+            db.session.rollback()
+            print(f"⚠️  Skoring submit gagal: {e}")
+            scored = 0
+        if scored:
+            print(f"✅ {scored} submit siswa dihitung")
+            continue
+
+        # Job hitung ulang cukup dicek tiap poll_interval
+        now = time.monotonic()
+        job = None
+        if once or now - last_poll >= poll_interval:
+            last_poll = now
+            job = claim_next_job()
+        if job:
+            print(f"🔄 Job #{job.id} (periode {job.periode_id}, alasan: {job.alasan})")
+            run_job(job)
+            print(f"   ↳ {job.status}: {job.processed}/{job.total} siswa")
+            continue
+
+        if once:
+            return
+        db.session.remove()  # Lepas koneksi selama idle
+        time.sleep(Config.SCORING_INTERVAL)
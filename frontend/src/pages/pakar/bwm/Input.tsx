@@ -39,7 +39,11 @@ export default function BwmInput() {
     const [processing, setProcessing] = useState(false);
 
     // Consistency Ratio State
+    // crValue = CR dari LP (dicek saat simpan, batas 0.1); crInput = CR berbasis input (realtime, tanpa solver)
+    // dengan batasnya sendiri (tergantung a_BW & jumlah kriteria)
     const [crValue, setCrValue] = useState<number | null>(null);
+    const [crInput, setCrInput] = useState<number | null>(null);
+    const [crInputBatas, setCrInputBatas] = useState<number | null>(null);
 
     // Fetch Initial Data
     useEffect(() => {
@@ -84,7 +88,9 @@ export default function BwmInput() {
                     others_to_worst: othersToWorst
                 });
                 if (res.status === 200) {
-                    setCrValue(res.data.cr);
+                    setCrValue(null); // CR LP lama tidak berlaku lagi setelah input berubah
+                    setCrInput(res.data.cr_input);
+                    setCrInputBatas(res.data.cr_input_batas);
                 }
             } catch (err) {
                 console.error("Error calculating CR:", err);
@@ -138,22 +144,29 @@ export default function BwmInput() {
             return;
         }
 
-        // 2. Cek Konsistensi (Optional Warning)
-        if (crValue !== null && crValue > 0.1) {
-            await MySwal.fire({
-                icon: 'error', // Icon error untuk menandakan tidak bisa lanjut
-                title: 'Konsistensi Tidak Valid',
-                html: `Nilai CR Anda adalah <b>${crValue.toFixed(4)}</b> (> 0.1).<br/>Sistem mensyaratkan nilai CR harus ≤ 0.1 (Konsisten).<br/>Silakan perbaiki penilaian Anda.`,
-                confirmButtonText: 'Perbaiki Dulu', // Hanya satu tombol
-                confirmButtonColor: '#3085d6',
-                showCancelButton: false, // Hilangkan tombol cancel/lanjut
-                allowOutsideClick: false
-            });
-            return; // STOP: Jangan lanjut ke proses penyimpanan
-        }
-
         setProcessing(true);
         try {
+            // 2. Cek Konsistensi: CR final dari LP (sama dengan validasi saat simpan)
+            const check = await apiClient.post('/bwm/calculate', {
+                best_to_others: bestToOthers,
+                others_to_worst: othersToWorst,
+                final: true
+            });
+            const cr: number = check.data.cr;
+            setCrValue(cr);
+            if (cr > 0.1) {
+                await MySwal.fire({
+                    icon: 'error', // Icon error untuk menandakan tidak bisa lanjut
+                    title: 'Konsistensi Tidak Valid',
+                    html: `Nilai CR Anda adalah <b>${cr.toFixed(4)}</b> (> 0.1).<br/>Sistem mensyaratkan nilai CR harus ≤ 0.1 (Konsisten).<br/>Silakan perbaiki penilaian Anda.`,
+                    confirmButtonText: 'Perbaiki Dulu', // Hanya satu tombol
+                    confirmButtonColor: '#3085d6',
+                    showCancelButton: false, // Hilangkan tombol cancel/lanjut
+                    allowOutsideClick: false
+                });
+                return; // STOP: Jangan lanjut ke proses penyimpanan
+            }
+
             await apiClient.post('/bwm/save', {
                 best_to_others: bestToOthers,
                 others_to_worst: othersToWorst
@@ -186,6 +199,11 @@ export default function BwmInput() {
 
     const scaleOptions = [1, 2, 3, 4, 5, 6, 7, 8, 9];
 
+    // CR yang ditampilkan: CR LP jika sudah dicek saat simpan, selain itu CR input realtime
+    const crTampil = crValue ?? crInput;
+    const crBatas = crValue !== null ? 0.1 : crInputBatas;
+    const crKonsisten = crTampil !== null && crBatas !== null && crTampil <= crBatas;
+
     if (!isReady) {
         return (
             <div className="min-h-screen flex flex-col justify-center items-center bg-gray-50">
@@ -216,32 +234,34 @@ export default function BwmInput() {
                     </div>
 
                     <div className={`sticky top-20 z-30 shadow-lg p-4 mb-8 rounded-xl border flex flex-col md:flex-row justify-between items-center transition-all duration-500 backdrop-blur-md ${
-                        crValue === null ? 'bg-white/95 border-gray-200' :
-                        crValue <= 0.1 ? 'bg-emerald-50/95 border-emerald-200 text-emerald-800' : 
+                        crTampil === null ? 'bg-white/95 border-gray-200' :
+                        crKonsisten ? 'bg-emerald-50/95 border-emerald-200 text-emerald-800' : 
                         'bg-amber-50/95 border-amber-200 text-amber-800'
                     }`}>
                         <div className="flex items-center gap-3">
-                            <div className={`p-2 rounded-full ${crValue !== null && crValue <= 0.1 ? 'bg-emerald-100' : 'bg-gray-200'}`}>
+                            <div className={`p-2 rounded-full ${crKonsisten ? 'bg-emerald-100' : 'bg-gray-200'}`}>
                                 <svg className="w-6 h-6" fill="none" viewBox="0 0 24 24" stroke="currentColor">
                                     <path strokeLinecap="round" strokeLinejoin="round" strokeWidth={2} d="M9 12l2 2 4-4m6 2a9 9 0 11-18 0 9 9 0 0118 0z" />
                                 </svg>
                             </div>
                             <div>
-                                <span className="font-bold block text-sm opacity-70">Consistency Ratio (CR)</span>
+                                <span className="font-bold block text-sm opacity-70">
+                                    {crValue !== null ? 'Consistency Ratio (CR)' : 'CR Input (indikatif)'}
+                                </span>
                                 <span className="text-2xl font-mono font-bold tracking-tight">
-                                    {crValue !== null ? crValue.toFixed(4) : '-'}
+                                    {crTampil !== null ? crTampil.toFixed(4) : '-'}
                                 </span>
                             </div>
                         </div>
 
                         <div className="text-right mt-2 md:mt-0">
-                            {crValue === null && <span className="text-sm text-gray-500 italic">Isi perbandingan untuk melihat CR...</span>}
-                            {crValue !== null && crValue > 0.1 && (
+                            {crTampil === null && <span className="text-sm text-gray-500 italic">Isi perbandingan untuk melihat CR...</span>}
+                            {crTampil !== null && !crKonsisten && (
                                  <span className="inline-flex items-center px-4 py-1.5 rounded-full text-xs font-bold bg-white border border-amber-200 text-amber-800 shadow-sm animate-pulse">
-                                     ⚠️ Tidak Konsisten (Target &le; 0.1)
+                                     ⚠️ Tidak Konsisten (Target &le; {crBatas})
                                  </span>
                             )}
-                            {crValue !== null && crValue <= 0.1 && (
+                            {crTampil !== null && crKonsisten && (
                                  <span className="inline-flex items-center px-4 py-1.5 rounded-full text-xs font-bold bg-white border border-emerald-200 text-emerald-800 shadow-sm">
                                      ✅ Konsisten (Baik)
                                  </span>